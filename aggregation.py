@@ -0,0 +1,105 @@
+from itertools import islice
+
+import pandas as pd
+
+from extractors import RECORD_FIELDS
+
+# ============================
+# 工资汇总
+# ============================
+#
+# 按姓名、车间、日期、产品对 数量/金额 求和，结果作为附加工作表写入同一个输出文件，
+# 财务人员不必再在 Excel 中对几十万行明细做数据透视表。汇总用 pandas groupby 完成，
+# 文本列先转为 category 类型，分组只在整数编号上进行。没有 to_dataframe 的记录来源
+# （SpillingRecordStore、数据库查询结果）按块汇总后再合并，内存只与块大小和分组数有关。
+
+# 汇总表名称 → 分组字段
+AGGREGATIONS = {
+    "按人员汇总": ["姓名"],
+    "按车间汇总": ["车间名称"],
+    "按日期汇总": ["日期"],
+    "按产品汇总": ["产品名称"],
+    "人员日明细汇总": ["日期", "车间名称", "姓名", "产品名称"],
+}
+
+GROUP_FIELDS = ["姓名", "车间名称", "日期", "产品名称"]
+
+# 汇总列：(列名, 源字段, 聚合方式)
+SUMMARY_COLUMNS = [
+    ("数量合计", "数量", "sum"),
+    ("金额合计", "金额", "sum"),
+    ("记录数", "金额", "size"),
+]
+
+# 分块汇总时每块的记录数
+AGGREGATE_CHUNK_ROWS = 200000
+
+
+def _sorted_category(series):
+    """转为 category 类型，类别按名称排序，汇总表中的行按名称排列；无法排序（类型混杂）时保持出现顺序"""
+    series = series.astype("category")
+    try:
+        return series.cat.reorder_categories(sorted(series.cat.categories))
+    except TypeError:
+        return series
+
+
+def records_to_frame(records):
+    """将记录（RecordStore、记录字典或记录元组）转换为汇总用的 DataFrame，只保留分组字段和数值字段"""
+    if hasattr(records, "to_dataframe"):
+        frame = records.to_dataframe()
+    else:
+        from writers import iter_record_rows
+        frame = pd.DataFrame.from_records(iter_record_rows(records), columns=RECORD_FIELDS)
+    frame = frame[GROUP_FIELDS + ["数量", "金额"]].copy()
+    for field in GROUP_FIELDS:
+        frame[field] = _sorted_category(frame[field])
+    for field in ("数量", "金额"):
+        frame[field] = pd.to_numeric(frame[field], errors="coerce").fillna(0.0)
+    return frame
+
+
+def _group_tables(frame, aggregations):
+    return {sheet_name: frame.groupby(keys, observed=True, sort=True, dropna=False)
+            .agg(**{column: (field, how) for column, field, how in SUMMARY_COLUMNS}).reset_index()
+            for sheet_name, keys in aggregations.items()}
+
+
+def _merge_tables(tables, keys):
+    """合并各块的汇总结果：同一分组的合计与记录数相加"""
+    table = pd.concat(tables, ignore_index=True)
+    for key in keys:
+        table[key] = _sorted_category(table[key])
+    grouped = table.groupby(keys, observed=True, sort=True, dropna=False)
+    return grouped.agg(**{column: (column, "sum") for column, _, _ in SUMMARY_COLUMNS}).reset_index()
+
+
+def _iter_frames(records, chunk_rows):
+    from writers import iter_record_rows
+    rows = iter_record_rows(records)
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            break
+        yield records_to_frame(chunk)
+
+
+def aggregate(records, aggregations=AGGREGATIONS, chunk_rows=AGGREGATE_CHUNK_ROWS):
+    """计算各汇总表，返回 {汇总表名称: DataFrame}，按 aggregations 的顺序排列"""
+    if isinstance(records, pd.DataFrame) or hasattr(records, "to_dataframe"):
+        frame = records if isinstance(records, pd.DataFrame) else records_to_frame(records)
+        summaries = _group_tables(frame, aggregations)
+    else:
+        parts = [_group_tables(frame, aggregations) for frame in _iter_frames(records, chunk_rows)]
+        if len(parts) <= 1:
+            summaries = parts[0] if parts else _group_tables(records_to_frame([]), aggregations)
+        else:
+            summaries = {sheet_name: _merge_tables([part[sheet_name] for part in parts], keys)
+                         for sheet_name, keys in aggregations.items()}
+    for sheet_name, keys in aggregations.items():
+        table = summaries[sheet_name]
+        for key in keys:
+            # 空的分组字段写出为空单元格
+            values = table[key].astype(object)
+            table[key] = values.where(values.notna(), None)
+    return summaries
@@ -1,562 +1,400 @@
-import openpyxl
-from openpyxl import load_workbook
-import os
-from datetime import datetime, timedelta
-import re
-import streamlit as st
+import time
+from datetime import date
+from functools import partial
 from io import BytesIO
-import tempfile
-
-# ============================
-# 原有的核心逻辑类 (保持不变)
-# ============================
 
-class DateParser:
-    @staticmethod
-    def parse(date_str):
-        if not date_str:
-            return None
-        if isinstance(date_str, (int, float)):
-            return DateParser._parse_excel_number(date_str)
-        date_str = str(date_str).strip()
-        formats = [
-            (r"\d{4}[-/]\d{1,2}[-/]\d{1,2}", "%Y-%m-%d"),
-            (r"\d{4}年\d{1,2}月\d{1,2}日", "%Y年%m月%d日"),
-            (r"\d{2}年\d{1,2}月\d{1,2}日", "%y年%m月%d日"),
-            (r"\d{1,2}月\d{1,2}日", "%m月%d日"),
-            (r"\d{4}-\d{1,2}-\d{1,2} \d{1,2}:\d{1,2}:\d{1,2}", "%Y-%m-%d")
-        ]
-        for pattern, fmt in formats:
-            if re.match(pattern, date_str):
-                try:
-                    dt = datetime.strptime(date_str.split()[0] if " " in date_str else date_str, fmt)
-                    return dt.strftime("%Y/%m/%d")
-                except ValueError:
-                    continue
-        return None
-
-    @staticmethod
-    def _parse_excel_number(num):
-        try:
-            base_date = datetime(1899, 12, 30)
-            delta = timedelta(days=int(num))
-            return (base_date + delta).strftime("%Y/%m/%d")
-        except (ValueError, TypeError):
-            return None
-
-
-class DataValidator:
-    @staticmethod
-    def is_valid_name(name):
-        if not name or not isinstance(name, str):
-            return False
-        name = name.strip()
-        return (name and len(name) >= 2 and
-                name not in ["姓名", "合计", "序号", None, "日期", "优萌宠物车间生产日报表", "生产日报表"])
-
-    @staticmethod
-    def is_valid_number(value):
-        try:
-            float(value)
-            return True
-        except (TypeError, ValueError):
-            return False
-
-    @staticmethod
-    def validate_record(record):
-        required_fields = ["日期", "姓名", "产品名称"]
-        for field in required_fields:
-            if not record.get(field):
-                return False
-        return True
-
-
-class WorkshopDataExtractor:
-    def __init__(self, sheet_name):
-        self.sheet_name = sheet_name
-        self.current_date = None
-        self.current_batch = "0"
-        self.current_products = []
-        self.headers = []
-        self.date_pattern = re.compile(r'(\d{4}[-/年]\d{1,2}[-/月]\d{1,2}日?)')
-
-    def extract(self, ws, data_list):
-        print(f"\n[{self.sheet_name}车间] 开始处理工作表")
-        self._find_initial_metadata(ws)
-        for row in ws.iter_rows():
-            self._process_row(row, data_list)
-
-    def _find_initial_metadata(self, ws):
-        for row in ws.iter_rows(max_row=10):
-            for cell in row:
-                if cell.value:
-                    date_match = self.date_pattern.search(str(cell.value))
-                    if date_match:
-                        self.current_date = DateParser.parse(date_match.group())
-                    if isinstance(cell.value, str):
-                        cell_value = str(cell.value).strip()
-                        if '批次号：' in cell_value:
-                            self.current_batch = cell_value.split('：', 1)[-1].strip() or "0"
-                        elif '批号：' in cell_value:
-                            self.current_batch = cell_value.split('：', 1)[-1].strip() or "0"
-
-    def _try_extract_metadata_from_row(self, row):
-        for cell in row:
-            if cell.value:
-                parsed_date = DateParser.parse(cell.value)
-                if parsed_date:
-                    self.current_date = parsed_date
-                if isinstance(cell.value, str):
-                    cell_value = str(cell.value).strip()
-                    if '批次号：' in cell_value:
-                        self.current_batch = cell_value.split('：', 1)[-1].strip() or "0"
-                    elif '批号：' in cell_value:
-                        self.current_batch = cell_value.split('：', 1)[-1].strip() or "0"
-
-    def _process_row(self, row, data_list):
-        raise NotImplementedError
-
-    def _create_record(self, name, product, quantity, price, amount, batch=None, note=""):
-        record = {
-            "日期": self.current_date,
-            "姓名": name,
-            "批次号": batch if batch is not None else self.current_batch,
-            "产品名称": product,
-            "数量": float(quantity) if quantity is not None and DataValidator.is_valid_number(quantity) else 0,
-            "计量单位": "",
-            "单价": float(price) if price is not None and DataValidator.is_valid_number(price) else 0,
-            "金额": float(amount) if amount is not None and DataValidator.is_valid_number(amount) else 0,
-            "车间名称": self.sheet_name,
-            "备注": note
-        }
-        if record["金额"] == 0 and record["数量"] and record["单价"]:
-            record["金额"] = record["数量"] * record["单价"]
-        return record if DataValidator.validate_record(record) else None
-
-
-class RaorouExtractor(WorkshopDataExtractor):
-    def _is_header_row(self, row):
-        if len(row) > 1 and DataValidator.is_valid_name(row[1].value):
-            return False
-        for cell in row:
-            if cell.value:
-                cell_value = str(cell.value).strip()
-                if any(keyword in cell_value for keyword in ["数量", "单价", "金额", "件数", "价格", "总价", "备注"]):
-                    return True
-        return False
-
-    def _parse_header_row(self, row):
-        print(f"  [调试-Raorou] 发现表头行，进行解析。")
-        self.current_products = []
-        self.headers = []
-
-        quantity_cols = []
-        for i, cell in enumerate(row):
-            if cell.value:
-                cell_value = str(cell.value).strip()
-                if any(keyword in cell_value for keyword in ["数量", "件数"]):
-                    quantity_cols.append(i)
-
-        for q_col in quantity_cols:
-            batch_cell = row[q_col].offset(row=-1) if row[q_col].row > 1 else None
-            batch = batch_cell.value if batch_cell else "0"
-            batch = str(batch).strip() if batch else "0"
-
-            product_cell = row[q_col].offset(row=-1, column=1) if row[q_col].row > 1 and q_col + 1 < len(row) else None
-            product = product_cell.value if product_cell else None
-            product = str(product).strip() if product else f"产品{len(self.current_products) + 1}"
-
-            if product not in self.current_products:
-                self.current_products.append(product)
-
-            price_col = None
-            amount_col = None
-            note_col = None
-
-            for j in range(q_col + 1, min(q_col + 5, len(row))):
-                if j < len(row) and row[j].value:
-                    cell_value = str(row[j].value).strip()
-                    if any(keyword in cell_value for keyword in ["单价", "价格"]):
-                        price_col = j
-                    elif any(keyword in cell_value for keyword in ["金额", "总价"]):
-                        amount_col = j
-                    elif "备注" in cell_value:
-                        note_col = j
-
-            if price_col is None:
-                price_col = q_col + 1 if q_col + 1 < len(row) else None
-
-            if amount_col is None:
-                amount_col = q_col + 2 if q_col + 2 < len(row) else None
-
-            if note_col is None:
-                note_col = q_col + 3 if q_col + 3 < len(row) else None
-
-            self.headers.append({
-                'col': q_col + 1,
-                'type': '数量',
-                'product': product,
-                'batch': batch
-            })
-
-            if price_col is not None:
-                self.headers.append({
-                    'col': price_col + 1,
-                    'type': '单价',
-                    'product': product
-                })
-
-            if amount_col is not None:
-                self.headers.append({
-                    'col': amount_col + 1,
-                    'type': '金额',
-                    'product': product
-                })
-
-            if note_col is not None:
-                self.headers.append({
-                    'col': note_col + 1,
-                    'type': '备注',
-                    'product': product
-                })
-
-    @staticmethod
-    def _find_product_names(sheet, current_row):
-        products = []
-        for r in range(max(1, current_row - 5), current_row):
-            for cell in sheet[r]:
-                if cell.value and isinstance(cell.value, str):
-                    cell_value = str(cell.value).strip()
-                    if '产品名称：' in cell_value:
-                        product = cell_value.split('：', 1)[-1].strip()
-                        if product and product not in products:
-                            products.append(product)
-                    elif '品名：' in cell_value:
-                        product = cell_value.split('：', 1)[-1].strip()
-                        if product and product not in products:
-                            products.append(product)
-
-        if len(products) < 3:
-            products = ["5\"*12g漂白皮卷绕鸭肉", "螺旋三明治", "拆钩子"]
-
-        return products
-
-    def _is_data_row(self, row):
-        return len(row) > 1 and DataValidator.is_valid_name(row[1].value)
-
-    def _parse_data_row(self, row, data_list):
-        name = row[1].value if len(row) > 1 else None
-        if not name or not DataValidator.is_valid_name(name):
-            return
-
-        for i in range(0, len(self.headers), 4):
-            if i + 3 >= len(self.headers):
-                continue
-
-            product_info = self.headers[i]
-            product = product_info['product']
-            batch = product_info.get('batch', "0")
-
-            qty_col = self.headers[i]['col'] - 1
-            price_col = self.headers[i + 1]['col'] - 1 if i + 1 < len(self.headers) else None
-            amount_col = self.headers[i + 2]['col'] - 1 if i + 2 < len(self.headers) else None
-            note_col = self.headers[i + 3]['col'] - 1 if i + 3 < len(self.headers) else None
-
-            qty = row[qty_col].value if qty_col < len(row) else None
-            price = row[price_col].value if price_col is not None and price_col < len(row) else None
-            amount = row[amount_col].value if amount_col is not None and amount_col < len(row) else None
-
-            note = ""
-            if note_col is not None and note_col < len(row):
-                try:
-                    note_cell = row[note_col]
-                    note = note_cell.value
-                except Exception:
-                    note = ""
-
-            has_data = False
-
-            if qty is not None:
-                qty_str = str(qty).strip()
-                if qty_str != "" and DataValidator.is_valid_number(qty_str):
-                    has_data = True
-
-            if not has_data and amount is not None:
-                amount_str = str(amount).strip()
-                if amount_str != "" and DataValidator.is_valid_number(amount_str):
-                    has_data = True
-
-            if not has_data and note is not None:
-                try:
-                    note_str = str(note).strip()
-                    if note_str != "":
-                        has_data = True
-                except Exception as e:
-                    print(f"  [警告] 处理备注 '{note}' 时出错: {str(e)}，将忽略此备注信息。")
-
-            if has_data:
-                record = self._create_record(
-                    name,
-                    product,
-                    qty if qty is not None else 0,
-                    price if price is not None else 0,
-                    amount if amount is not None else 0,
-                    batch,
-                    str(note) if note is not None else ""
-                )
-                if record:
-                    data_list.append(record)
-                    # print(f"  提取记录: {record}") # 注释掉以避免网页刷屏
-
-    def _process_row(self, row, data_list):
-        if self._is_header_row(row):
-            self._parse_header_row(row)
-        elif self._is_data_row(row):
-            # name = row[1].value if len(row) > 1 else "未知"
-            # print(f"  [调试-Raorou] 发现数据行，姓名: '{name}'，开始解析。")
-            self._parse_data_row(row, data_list)
-        else:
-            self._try_extract_metadata_from_row(row)
-
-
-class ZhizuoExtractor(RaorouExtractor):
-    pass
-
-
-class BaozhuangExtractor(WorkshopDataExtractor):
-    def extract(self, ws, data_list):
-        print(f"\n[{self.sheet_name}车间] 开始处理工作表")
-        max_col = ws.max_column or len(list(ws.iter_rows())[0]) if ws.iter_rows() else 0
-
-        for row in ws.iter_rows():
-            if not any(cell.value for cell in row):
-                continue
-            self._process_row(row, data_list, max_col)
-
-    def _is_header_row(self, row):
-        return False
-
-    def _parse_header_row(self, row):
-        pass
-
-    def _is_data_row(self, row):
-        return False
-
-    def _parse_data_row(self, row, data_list, max_col):
-        block_size = 8
-        block_count = (max_col + block_size - 1) // block_size
-
-        for block_index in range(block_count):
-            offset = block_index * block_size
-
-            if offset >= len(row):
-                continue
-
-            name_col = offset + 1
-            product_col = offset + 3
-
-            if name_col >= len(row) or product_col >= len(row):
-                continue
-
-            name_cell = row[name_col]
-            if not (name_cell.value and DataValidator.is_valid_name(name_cell.value)):
-                continue
-
-            product_cell = row[product_col]
-            if not (product_cell.value and isinstance(product_cell.value, str) and
-                    not any(keyword in str(product_cell.value) for keyword in ["产品名称", "品名"])):
-                continue
-
-            name = str(name_cell.value).strip()
-
-            date_col = offset
-            batch_col = offset + 2
-            quantity_col = offset + 4
-            price_col = offset + 5
-            amount_col = offset + 6
-            note_col = offset + 7
-
-            if date_col < len(row) and row[date_col].value:
-                parsed_date = DateParser.parse(row[date_col].value)
-                if parsed_date:
-                    self.current_date = parsed_date
-
-            batch = row[batch_col].value if batch_col < len(row) else "0"
-            product = row[product_col].value if product_col < len(row) else ""
-            quantity = row[quantity_col].value if quantity_col < len(row) else 0
-            price = row[price_col].value if price_col < len(row) else 0
-            amount = row[amount_col].value if amount_col < len(row) else 0
-
-            note = ""
-            if note_col < len(row):
-                try:
-                    note_cell = row[note_col]
-                    note = note_cell.value
-                except Exception:
-                    note = ""
-
-            has_data = False
-            if quantity is not None:
-                try:
-                    quantity_str = str(quantity).strip()
-                    if quantity_str != "" and DataValidator.is_valid_number(quantity_str):
-                        has_data = True
-                except Exception:
-                    pass
-
-            if not has_data and amount is not None:
-                try:
-                    amount_str = str(amount).strip()
-                    if amount_str != "" and DataValidator.is_valid_number(amount_str):
-                        has_data = True
-                except Exception:
-                    pass
-
-            if not has_data and note is not None:
-                try:
-                    note_str = str(note).strip()
-                    if note_str != "":
-                        has_data = True
-                except Exception as e:
-                    print(f"  [警告] 处理备注 '{note}' 时出错: {str(e)}，将忽略此备注信息。")
-
-            if product and has_data:
-                record = self._create_record(name, product, quantity, price, amount, batch,
-                                             str(note) if note is not None else "")
-                if record:
-                    data_list.append(record)
-                    # print(f"  提取记录: {record}")
-
-    def _process_row(self, row, data_list, max_col=None):
-        if max_col is None:
-            max_col = len(row)
-        self._try_extract_metadata_from_row(row)
-        self._parse_data_row(row, data_list, max_col)
+import pandas as pd
+import streamlit as st
 
+from aggregation import aggregate
+from archive import ReportArchive, is_archive
+from dedup import CONFLICT_SHEET, POLICIES, DeduplicatedRecords, DuplicateIndex, index_files, ranked_file_rows
+from extractors import BACKENDS, ENGINES, RECORD_FIELDS, is_report_file
+from incremental import DEFAULT_DB_PATH, RecordDatabase
+from ingest import SPILL_THRESHOLD_BYTES, BufferReader
+from parallel import default_workers
+from instrumentation import stats_table, stats_to_json
+from jobs import JOB_STATES, JobQueue, JobRejected
+from pipeline import run_stats
+from result_cache import ResultCache
+from sheet_selection import SheetFilter, parse_patterns
+from writers import OUTPUT_FORMATS, write_output
 
 # ============================
-# 适配 Streamlit 的输出函数
+# Streamlit 界面与主逻辑
 # ============================
 
-def save_to_output(data_list):
-    """将数据保存到内存中的 BytesIO 对象，而不是磁盘路径"""
-    if not data_list:
-        return None
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "数据收集表"
+# 处理过程中页面刷新进度的间隔（秒）
+POLL_SECONDS = 1.0
+# 处理过程中预览的最近记录数
+PREVIEW_ROWS = 200
+# 作业临时目录中保存汇总表和重复记录表的文件名
+SUMMARIES_FILE = "summaries.pkl"
+CONFLICTS_FILE = "conflicts.pkl"
 
-    headers = ["日期", "姓名", "批次号", "产品名称", "数量", "计量单位", "单价", "金额", "车间名称", "备注"]
+@st.cache_resource
+def get_result_cache():
+    """提取结果缓存，同一服务进程内的所有会话共享"""
+    return ResultCache()
 
-    for col, header in enumerate(headers, 1):
-        ws.cell(row=1, column=col, value=header)
 
-    for i, data in enumerate(data_list, 2):
-        for col, key in enumerate(headers, 1):
-            value = data.get(key, "")
-            ws.cell(row=i, column=col, value=value)
+@st.cache_resource
+def get_job_queue():
+    """作业队列，同一服务进程内的所有会话共享：同时运行的作业数有上限，其余排队"""
+    return JobQueue()
 
-    # 将工作簿写入内存缓冲区
-    output_buffer = BytesIO()
-    wb.save(output_buffer)
-    output_buffer.seek(0) # 将指针移回开头
-    return output_buffer
-
-
-# ============================
-# Streamlit 界面与主逻辑
-# ============================
 
 def main():
     st.set_page_config(page_title="车间日报提取工具", layout="wide")
     st.title("🏭 车间生产日报数据处理系统")
     st.markdown("""
     **使用说明：**
-    1. 点击下方按钮上传车间日报表文件（支持 .xlsx, .xls）。
+    1. 点击下方按钮上传车间日报表文件（支持 .xlsx, .xls，也可以将多个日报打包为 .zip 上传）。
     2. 系统会自动识别文件名中包含 "优萌车间" 或 "生产日报" 的文件。
     3. 点击 "开始处理" 按钮。
     4. 处理完成后，点击 "下载结果文件" 按钮保存汇总表。
     """)
     st.markdown("---")
+    queue = get_job_queue()
 
     # 1. 文件上传组件 (替代原有的 input_folder_path)
     uploaded_files = st.file_uploader(
         "📤 请选择要处理的文件 (可多选)", 
-        type=['xlsx', 'xls'], 
+        type=['xlsx', 'xls', 'zip'], 
         accept_multiple_files=True
     )
-
-    if st.button("🚀 开始处理", type="primary"):
+    streaming = st.checkbox("流式读取（低内存模式，适合行数很多的月末报表）", value=True)
+    output_format = st.selectbox("输出格式", list(OUTPUT_FORMATS), index=0,
+                                 help="xlsx 适合直接用 Excel 打开；csv/parquet 适合记录数很多时导入其他系统")
+    with_summary = st.checkbox("计算按人员/车间/日期/产品的数量、金额汇总（xlsx 中写为附加工作表）", value=True)
+    duplicate_policy = st.selectbox(
+        "重复记录（同一日期、姓名、车间、产品、批次号出现在多个文件中）", ["off"] + list(POLICIES), index=1,
+        format_func=lambda policy: POLICIES.get(policy, "不检查"),
+        help="重复上传或更正后的日报与原版本一起上传时，同一条工资会被算两次；重复的记录写入“重复记录”工作表。"
+             "文件的新旧按上传顺序判断，后上传的较新（增量模式按入库时间）")
+    with st.expander("⚙️ 并行处理设置"):
+        # 多人同时使用时每个作业的进程数有上限，见 jobs.JobQueue
+        workers = st.number_input(f"并行进程数 (1 表示逐个处理，最多 {queue.max_workers})", min_value=1,
+                                  max_value=queue.max_workers, value=min(default_workers(), queue.max_workers))
+        per_sheet = st.checkbox("按工作表分发任务（文件少、工作表多时更快）", value=False)
+        spill_mb = st.number_input("超过该大小 (MB) 的文件写入临时文件后解析，其余直接在内存中解析",
+                                   min_value=1, value=SPILL_THRESHOLD_BYTES // (1024 * 1024))
+        spill_threshold = spill_mb * 1024 * 1024
+        memory_limit_mb = queue.memory_limit // (1024 * 1024)
+        records_limit_mb = st.number_input(f"提取结果占用内存超过该大小 (MB) 时分块写入临时文件（0 表示使用上限 "
+                                           f"{memory_limit_mb} MB）", min_value=0, max_value=memory_limit_mb, value=0)
+        use_cache = st.checkbox("复用已处理过的相同文件的结果（按文件内容判断）", value=True)
+        backend = st.selectbox("工作簿读取方式", BACKENDS, index=0,
+                               help="lxml 直接流式解析 xlsx 中的工作表 XML，通常比 openpyxl 快；读取失败时自动改用 openpyxl")
+        engine = st.selectbox("绕肉/制作表处理引擎", ENGINES, index=0,
+                              help="row 逐行处理；grid 将整张表读入数组后按列组批量计算，结果相同，耗时与逐行处理相当")
+    with st.expander("📑 工作表筛选（跳过汇总、图表数据、归档等不含人员数据的工作表）"):
+        include_text = st.text_input("只处理名称匹配的工作表（逗号分隔，可用 * ? 通配符，留空表示全部）", value="")
+        exclude_text = st.text_input("不处理名称匹配的工作表（逗号分隔，可用 * ? 通配符）", value="",
+                                     placeholder="汇总, 图表*, 归档*")
+        probe_rows = st.number_input("预检行数：前 N 行中没有人员姓名的工作表不处理（0 表示不预检）",
+                                     min_value=0, value=0)
+        sheet_filter = SheetFilter(parse_patterns(include_text), parse_patterns(exclude_text), probe_rows)
+    with st.expander("🗄️ 增量模式（按天累积到本地数据库）"):
+        incremental = st.checkbox("启用增量模式：已入库的文件不再解析，结果表按日期范围从数据库生成", value=False)
+        db_path = st.text_input("数据库文件路径", value=DEFAULT_DB_PATH)
+        today = date.today()
+        date_range = st.date_input("结果表日期范围", value=(today.replace(day=1), today))
+
+    # 作业编号同时写入页面地址，保留期限内刷新或重新打开该地址仍可查看结果
+    job_id = st.session_state.get("job_id") or st.query_params.get("job")
+    job = queue.get(job_id) if job_id else None
+    if job_id and job is None:
+        st.warning(f"⌛ 作业 {job_id} 不存在或已超过保留期限，请重新处理。")
+        st.session_state.pop("job_id", None)
+        st.query_params.pop("job", None)
+    if st.button("🚀 开始处理", type="primary", disabled=job is not None and job.active):
         if not uploaded_files:
             st.warning("⚠️ 请先上传至少一个文件！")
         else:
-            all_data = []
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            processed_count = 0
-
-            # 2. 处理逻辑 (替代原有的 os.listdir 遍历)
+            # 文件名过滤 (保持原有逻辑)
+            # 压缩包中的工作簿同样按文件名过滤，解析时才逐个解压
+            target_files = []
+            skipped_files = []
+            archive_errors = []
             for uploaded_file in uploaded_files:
-                processed_count += 1
-                progress_bar.progress(processed_count / len(uploaded_files))
-                status_text.text(f"正在处理: {uploaded_file.name} ...")
-                
-                # 文件名过滤 (保持原有逻辑)
-                if "优萌车间" not in uploaded_file.name and "生产日报" not in uploaded_file.name:
-                    st.info(f"⏭️ 文件 '{uploaded_file.name}' 不包含关键字，已跳过。")
+                if is_archive(uploaded_file.name):
+                    try:
+                        members = ReportArchive(BufferReader(uploaded_file.getbuffer())).members()
+                    except Exception as e:
+                        archive_errors.append((uploaded_file.name, str(e)))
+                        continue
+                    for member in members:
+                        if not is_report_file(member.name):
+                            skipped_files.append(f"{uploaded_file.name}/{member.path}")
+                            continue
+                        target_files.append((member.name, member))
+                    continue
+                if not is_report_file(uploaded_file.name):
+                    skipped_files.append(uploaded_file.name)
                     continue
-                
-                try:
-                    # openpyxl 可以直接读取 UploadedFile 对象
-                    # 但为了兼容性，我们使用临时文件方式读取
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as tmp:
-                        tmp.write(uploaded_file.getbuffer())
-                        tmp_path = tmp.name
-                    
-                    wb = load_workbook(tmp_path, data_only=True)
-                    
-                    for sheet_name in wb.sheetnames:
-                        ws = wb[sheet_name]
-                        extractor = None
-                        if "绕肉" in sheet_name:
-                            extractor = RaorouExtractor(sheet_name)
-                        elif "制作" in sheet_name:
-                            extractor = ZhizuoExtractor(sheet_name)
-                        elif "包装" in sheet_name or "挑选" in sheet_name:
-                            extractor = BaozhuangExtractor(sheet_name)
-                        else:
-                            # 默认提取器
-                            extractor = BaozhuangExtractor(sheet_name)
-
-                        if extractor:
-                            try:
-                                extractor.extract(ws, all_data)
-                            except Exception as e:
-                                st.error(f"处理工作表 '{sheet_name}' 时出错: {str(e)}")
-                    
-                    wb.close()
-                    # 删除临时文件
-                    os.unlink(tmp_path)
-
-                except Exception as e:
-                    st.error(f"❌ 处理文件 {uploaded_file.name} 时发生错误: {str(e)}")
-
-            # 3. 输出结果 (替代原有的 output_file_path)
-            status_text.text("处理完成，正在生成文件...")
-            if all_data:
-                output_buffer = save_to_output(all_data)
-                
-                st.success(f"✅ 处理完成！共提取有效记录 **{len(all_data)}** 条。")
-                
-                st.download_button(
-                    label="📥 下载结果文件 (生产车间统计数据收集.xlsx)",
-                    data=output_buffer,
-                    file_name="生产车间统计数据收集.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+                target_files.append((uploaded_file.name, uploaded_file.getbuffer()))
+
+            # 2. 处理逻辑 (替代原有的 os.listdir 遍历)
+            # 提交到作业队列，在后台线程中运行，页面保持响应；已入库或已缓存的文件不再解析，
+            # 上传缓冲区直接在内存中解析，大文件才落盘；每个文件的记录完成后即转存，内存占用有上限
+            # 无论并行进程数多少都按 (文件名, 上传顺序) 合并，输出的行顺序不随设置变化
+            database = RecordDatabase(db_path) if incremental else None
+            # 增量模式的重复检查在生成结果表时按日期范围对数据库中的文件进行
+            duplicates = DuplicateIndex() if duplicate_policy != "off" and database is None else None
+            settings = {
+                "output_format": output_format,
+                "with_summary": with_summary,
+                "duplicate_policy": duplicate_policy,
+                "database": database,
+                "date_range": (tuple(date_range) + (None, None))[:2],
+                "skipped_files": skipped_files,
+                "archive_errors": archive_errors,
+            }
+            try:
+                job = queue.submit(
+                    target_files, settings=settings, memory_limit=records_limit_mb * 1024 * 1024 or None,
+                    by_name=True, duplicates=duplicates,
+                    workers=workers, per_sheet=per_sheet, streaming=streaming,
+                    spill_threshold=spill_threshold, cache=get_result_cache() if use_cache else None,
+                    database=database, engine=engine, backend=backend,
+                    sheet_filter=sheet_filter if sheet_filter.active else None)
+            except JobRejected as e:
+                st.error(f"⛔ {e}")
             else:
-                st.warning("⚠️ 未能提取到任何有效数据，请检查上传的文件格式是否正确。")
+                st.session_state["job_id"] = job.id
+                st.query_params["job"] = job.id
+
+    if job is not None:
+        settings = job.settings
+        for file_name in settings["skipped_files"]:
+            st.info(f"⏭️ 文件 '{file_name}' 不包含关键字，已跳过。")
+        for file_name, message in settings["archive_errors"]:
+            st.error(f"❌ 压缩包 '{file_name}' 无法打开: {message}")
+        state = job.state
+        if state == "queued":
+            show_queue(queue, job)
+        elif state == "running":
+            show_progress(job.run, settings)
+        elif job.dropped:
+            st.info("⏹️ 作业在开始前已取消。")
+        else:
+            show_results(job)
+
+
+def duplicate_index(run, settings):
+    """重复记录索引：普通模式在处理过程中建立；增量模式按日期范围从数据库建立，处理结束后只建立一次"""
+    database = settings["database"]
+    if settings["duplicate_policy"] == "off":
+        return None
+    if database is None:
+        return run.duplicates
+    if run.running:
+        return index_files(database.query_files(*settings["date_range"]))
+    if "duplicates" not in settings:
+        settings["duplicates"] = index_files(database.query_files(*settings["date_range"]))
+    return settings["duplicates"]
+
+
+def output_source(run, settings):
+    """
+    结果表的记录来源：增量模式下按日期范围查询数据库，否则为已完成文件的记录；
+    选择了保留最新/最先的文件时去掉其他文件中的重复记录
+    """
+    database = settings["database"]
+    policy = settings["duplicate_policy"]
+    if policy in ("off", "report-only"):
+        return database.query(*settings["date_range"]) if database is not None else run.to_store()
+    index = duplicate_index(run, settings)
+    if database is not None:
+        return DeduplicatedRecords(lambda: ranked_file_rows(database.query_files(*settings["date_range"])),
+                                   index, policy)
+    return DeduplicatedRecords(run.iter_ranked_rows, index, policy)
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def show_queue(queue, job):
+    """排队期间定时刷新排队位置；作业开始后刷新整个页面显示进度"""
+    if job.state != "queued":
+        st.rerun()
+    position = queue.position(job)
+    counts = queue.stats()
+    st.info(f"⏳ 服务器正在处理其他作业，本作业排在第 {position} 位"
+            f"（{JOB_STATES['running']} {counts['running']} 个，{JOB_STATES['queued']} {counts['queued']} 个）。")
+    st.caption(f"作业编号 {job.id}；结束后结果保留 {queue.retention_seconds // 60} 分钟，"
+               f"期间刷新或重新打开本页面地址即可查看。")
+    st.button("⏹️ 取消排队", on_click=queue.cancel, args=(job,))
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def show_progress(run, settings):
+    """处理过程中定时刷新：进度、已提取的记录数与预览；可以取消剩余文件或下载已完成的部分"""
+    if not run.running:
+        # 处理结束，刷新整个页面显示结果
+        st.rerun()
+    state = run.snapshot(PREVIEW_ROWS)
+    st.progress(state["files_done"] / state["files_total"] if state["files_total"] else 1.0)
+    if run.cancelled:
+        st.text("正在取消，等待正在解析的文件完成 ...")
+    elif state["current_file"] is not None:
+        st.text(f"正在处理: {state['current_file']} ...")
+    else:
+        st.text(f"正在处理 ({state['parsed']}/{state['pending_total']} 个文件已解析) ...")
+
+    files_col, records_col, time_col = st.columns(3)
+    files_col.metric("已完成文件", f"{state['files_done']} / {state['files_total']}")
+    records_col.metric("已提取记录", state["records"])
+    time_col.metric("耗时", f"{run.elapsed:.0f} 秒")
+    if state["preview"]:
+        st.caption(f"最近提取的 {len(state['preview'])} 条记录")
+        st.dataframe(pd.DataFrame(state["preview"], columns=RECORD_FIELDS), use_container_width=True,
+                     hide_index=True)
+
+    cancel_col, download_col = st.columns(2)
+    cancel_col.button("⏹️ 取消剩余文件", on_click=run.cancel, disabled=run.cancelled)
+    if state["files_done"]:
+        file_name, mime = OUTPUT_FORMATS[settings["output_format"]]
+        download_col.download_button(
+            label=f"📥 下载已完成部分 ({state['files_done']} 个文件)",
+            # 点击时才生成文件，不影响刷新
+            data=partial(partial_output, run, settings),
+            file_name=f"部分结果_{file_name}",
+            mime=mime,
+            on_click="ignore"
+        )
+
+
+def partial_output(run, settings):
+    """已完成部分的结果文件；没有记录时也返回只有表头的文件"""
+    buffer = BytesIO()
+    write_output(output_source(run, settings), buffer, settings["output_format"])
+    return buffer.getvalue()
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def conflicts_csv(path):
+    return pd.read_pickle(path).to_csv(index=False).encode("utf-8-sig")
+
+
+def show_results(job):
+    """
+    处理结束后的结果：错误、跳过的工作表、统计、汇总和结果文件；汇总和结果文件只生成一次。
+    结果文件、汇总表和重复记录表写入作业的临时目录，作业保留期间不占用服务进程的内存，下载时才读取
+    """
+    run, settings = job.run, job.settings
+    if run.error is not None:
+        st.error(f"❌ 处理失败: {run.error}")
+    results = run.results
+    cancelled_count = sum(result is None or result.source == "cancelled" for result in results)
+    if cancelled_count:
+        st.warning(f"⏹️ 已取消，{cancelled_count} 个文件未处理，结果只包含已完成的文件。")
+
+    stored_count = sum(result.source == "database" for result in results if result is not None)
+    cached_count = sum(result.source == "cache" for result in results if result is not None)
+    if stored_count:
+        st.info(f"🗄️ {stored_count} 个文件已在数据库中，无需重新解析。")
+    if cached_count:
+        st.info(f"♻️ {cached_count} 个文件内容未变化，直接使用缓存结果。")
+
+    finished = run.finished_results()
+    for result in finished:
+        for sheet_name, message in result.errors:
+            if sheet_name is None:
+                st.error(f"❌ 处理文件 {result.name} 时发生错误: {message}")
+            else:
+                st.error(f"处理文件 {result.name} 的工作表 '{sheet_name}' 时出错: {message}")
+
+    skipped_sheets = [(result.name, sheet_name, reason) for result in finished
+                      for sheet_name, reason in result.skipped_sheets()]
+    if skipped_sheets:
+        with st.expander(f"⏭️ 按筛选规则跳过了 {len(skipped_sheets)} 个工作表"):
+            for file_name, sheet_name, reason in skipped_sheets:
+                st.text(f"{file_name} / {sheet_name}: {reason}")
+
+    # 每个文件/工作表的解析耗时与行数统计
+    stats = run_stats([result for result in results if result is not None])
+    with st.expander("📊 处理耗时统计"):
+        st.caption(f"总耗时 {run.elapsed:.1f} 秒")
+        st.dataframe(stats_table(stats), use_container_width=True)
+        st.download_button(
+            label="📥 下载统计 (JSON)",
+            data=stats_to_json(stats),
+            file_name="处理统计.json",
+            mime="application/json"
+        )
+
+    # 3. 输出结果 (替代原有的 output_file_path)
+    if "output" not in settings:
+        database = settings["database"]
+        source = output_source(run, settings)
+        if hasattr(source, "__len__"):
+            record_count = len(source)
+        else:
+            record_count = database.count(*settings["date_range"])
+        index = duplicate_index(run, settings)
+        conflicts = index.conflict_table(settings["duplicate_policy"]) if index is not None and len(index) else None
+        summaries = None
+        aggregate_seconds = 0.0
+        output_path = None
+        if record_count:
+            if settings["with_summary"]:
+                aggregate_start = time.perf_counter()
+                summaries = aggregate(source)
+                aggregate_seconds = time.perf_counter() - aggregate_start
+            sheets = dict(summaries or {})
+            if conflicts is not None:
+                sheets[CONFLICT_SHEET] = conflicts
+            output_path = job.path(OUTPUT_FORMATS[settings["output_format"]][0])
+            with open(output_path, "wb") as f:
+                write_output(output_source(run, settings), f, fmt=settings["output_format"], summaries=sheets)
+        if summaries:
+            pd.to_pickle(summaries, job.path(SUMMARIES_FILE))
+        if conflicts is not None:
+            conflicts.to_pickle(job.path(CONFLICTS_FILE))
+        settings["output"] = (record_count, bool(summaries), aggregate_seconds, conflicts is not None, output_path)
+    record_count, has_summaries, aggregate_seconds, has_conflicts, output_path = settings["output"]
+    summaries = pd.read_pickle(job.path(SUMMARIES_FILE)) if has_summaries else None
+    conflicts = pd.read_pickle(job.path(CONFLICTS_FILE)) if has_conflicts else None
+
+    if conflicts is not None:
+        index = duplicate_index(run, settings)
+        exact, conflicting = index.counts()
+        policy = settings["duplicate_policy"]
+        with st.expander(f"🔁 {len(index)} 组记录出现在多个文件中", expanded=True):
+            st.caption(f"完全重复 {exact} 组，数据不一致 {conflicting} 组；处理方式：{POLICIES[policy]}，"
+                       f"删除 {index.dropped(policy)} 条记录")
+            st.dataframe(conflicts, use_container_width=True, hide_index=True)
+            st.download_button(
+                label="📥 下载重复记录 (CSV)",
+                data=partial(conflicts_csv, job.path(CONFLICTS_FILE)),
+                file_name="重复记录.csv",
+                mime="text/csv"
+            )
+
+    if summaries:
+        with st.expander("🧮 汇总", expanded=True):
+            st.caption(f"汇总耗时 {aggregate_seconds:.2f} 秒")
+            for tab, (sheet_name, table) in zip(st.tabs(list(summaries)), summaries.items()):
+                with tab:
+                    st.dataframe(table, use_container_width=True, hide_index=True)
+
+    if record_count:
+        file_name, mime = OUTPUT_FORMATS[settings["output_format"]]
+
+        st.success(f"✅ 处理完成！共提取有效记录 **{record_count}** 条。")
+
+        st.download_button(
+            label=f"📥 下载结果文件 ({file_name})",
+            data=partial(read_file, output_path),
+            file_name=file_name,
+            mime=mime
+        )
+    else:
+        st.warning("⚠️ 未能提取到任何有效数据，请检查上传的文件格式是否正确。")
 
 if __name__ == "__main__":
     main()
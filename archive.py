@@ -0,0 +1,95 @@
+import posixpath
+import zipfile
+from datetime import datetime
+
+# ============================
+# 压缩包上传
+# ============================
+#
+# 一次上传几十个日报时，可以打包成 .zip 上传。压缩包不整体解压：每个工作簿成员是一个按需读取的来源
+# (ArchiveMember)，计算摘要时分块读取，解析时才解压读入内存（并行处理时在提交任务时读入），
+# 同一时刻内存中只有正在解析的工作簿。成员按文件名照常经过关键字过滤和提取器分发。
+
+ARCHIVE_EXTENSIONS = (".zip",)
+WORKBOOK_EXTENSIONS = (".xlsx", ".xls")
+
+# 解析成员文件名时依次尝试的编码：未标记 UTF-8 的文件名按这些编码解码（Windows 中文系统打包时为 GBK）
+NAME_ENCODINGS = ("utf-8", "gbk")
+
+
+def is_archive(file_name):
+    return file_name.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def member_path(info):
+    """成员在压缩包中的路径；未标记 UTF-8 的文件名被 zipfile 按 cp437 解码，此处还原后重新解码"""
+    if info.flag_bits & 0x800:
+        return info.filename
+    raw = info.filename.encode("cp437")
+    for encoding in NAME_ENCODINGS:
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return info.filename
+
+
+class ArchiveMember:
+    """压缩包中的一个工作簿：open() 时才解压，内容不在内存中保留"""
+
+    def __init__(self, archive, info):
+        self._archive = archive
+        self._info = info
+        self.path = member_path(info)
+        self.name = posixpath.basename(self.path)
+        # 解压后的大小
+        self.size = info.file_size
+
+    @property
+    def modified(self):
+        """压缩包中记录的修改时间（时间戳），记录的时间无效时为 None"""
+        try:
+            return datetime(*self._info.date_time).timestamp()
+        except ValueError:
+            return None
+
+    def open(self):
+        """解压读取的文件对象；加密或损坏的成员在此时或读取时抛出异常"""
+        return self._archive.open(self._info)
+
+    def __repr__(self):
+        return f"ArchiveMember({self.path!r})"
+
+
+class ReportArchive:
+    """
+    日报压缩包。
+
+    source: 文件路径或可 seek 的二进制文件对象（如 ingest.BufferReader 包装的上传缓冲区）；
+        打开失败时抛出 zipfile.BadZipFile
+    """
+
+    def __init__(self, source):
+        self._zip = zipfile.ZipFile(source)
+
+    def members(self):
+        """压缩包中的工作簿（按压缩包中的顺序），不含目录、其他类型的文件和 macOS 的资源文件"""
+        members = []
+        for info in self._zip.infolist():
+            if info.is_dir():
+                continue
+            member = ArchiveMember(self._zip, info)
+            if member.path.startswith("__MACOSX/") or member.name.startswith("._"):
+                continue
+            if member.name.lower().endswith(WORKBOOK_EXTENSIONS):
+                members.append(member)
+        return members
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,171 @@
+import logging
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+from pipeline import merge_ranks, ordered, process_files
+from record_store import RecordStore
+
+logger = logging.getLogger(__name__)
+
+# ============================
+# 后台处理
+# ============================
+#
+# Streamlit 的脚本线程在处理期间无法响应页面操作。处理流程改在后台线程中运行，
+# 每个文件完成后结果立即可见；页面脚本定时读取 snapshot() 显示进度、记录数和预览，
+# 可以随时取消剩余文件，并用已完成的文件生成部分结果。
+
+# snapshot() 最多返回的预览记录数
+PREVIEW_LIMIT = 500
+
+
+class BackgroundRun:
+    """
+    在后台线程中运行 pipeline.process_files。
+
+    files: [(文件名, 文件内容), ...]
+    by_name: 合并结果时是否按文件名排序，见 pipeline.ordered
+    store: 记录容器（如 record_store.SpillingRecordStore），每个文件完成后记录按合并顺序分组写入；
+        None 时记录保留在各文件的 FileResult 中
+    release_records: 文件完成（并写入 store）后释放 FileResult 中的记录，内存不随文件数增长
+    duplicates: 重复记录索引 (dedup.DuplicateIndex)，每个文件完成后以合并顺序中的位置加入，
+        新旧按 files 中的顺序（页面上的上传顺序）
+    options: 传给 process_files 的其余参数（workers、cache、database 等）
+    """
+
+    def __init__(self, files, by_name=False, store=None, release_records=False, duplicates=None, **options):
+        self.files = files
+        self.file_count = len(files)
+        self.by_name = by_name
+        self.store = store
+        self.release_records = release_records
+        self.duplicates = duplicates
+        self.options = options
+        self.results = [None] * len(files)
+        self._ranks = merge_ranks([name for name, _ in files], by_name)
+        # 文件序号，按完成顺序
+        self.completed = []
+        self._recent = deque(maxlen=PREVIEW_LIMIT)
+        self.parsed = 0
+        self.pending_total = 0
+        self.current_file = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="background-run", daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            results = process_files(self.files, on_progress=self._on_progress, on_result=self._on_result,
+                                    cancel=self._cancel, **self.options)
+            with self._lock:
+                self.results = results
+        except Exception as e:
+            logger.exception("后台处理失败")
+            self.error = str(e)
+        finally:
+            # 释放上传文件的缓冲区，结果在页面会话中保留
+            self.files = None
+            self.finished_at = time.perf_counter()
+
+    def _on_progress(self, done, total, file_name):
+        with self._lock:
+            self.parsed, self.pending_total, self.current_file = done, total, file_name
+
+    def _on_result(self, index, result):
+        if self.duplicates is not None:
+            self.duplicates.add_file(self._ranks[index], result.name, result.records, index, f"第 {index + 1} 个")
+        if self.store is not None:
+            self.store.extend_rows(result.records, group=self._ranks[index])
+        with self._lock:
+            self.results[index] = result
+            self.completed.append(index)
+            self._recent.extend(result.records[-PREVIEW_LIMIT:])
+        if self.release_records:
+            result.release_records()
+
+    def wait(self, timeout=None):
+        """等待运行结束，返回是否已结束"""
+        self._thread.join(timeout)
+        return not self.running
+
+    def cancel(self):
+        """不再开始新的文件；正在解析的文件完成后运行结束"""
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def running(self):
+        return self.finished_at is None
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def finished_results(self):
+        """已有结果的文件，按合并顺序"""
+        with self._lock:
+            results = [result for result in self.results if result is not None]
+        return ordered(results, by_name=self.by_name)
+
+    def snapshot(self, preview_rows=0):
+        """
+        当前状态：完成文件数、总文件数、解析进度、正在解析的文件、已提取的记录数，
+        以及最近完成的文件中的最后 preview_rows 条记录（按完成顺序，最多 PREVIEW_LIMIT 条）
+        """
+        with self._lock:
+            completed = [self.results[index] for index in self.completed]
+            preview = list(self._recent)[-preview_rows:] if preview_rows else []
+            return {
+                "files_done": len(completed),
+                "files_total": self.file_count,
+                "parsed": self.parsed,
+                "pending_total": self.pending_total,
+                "current_file": self.current_file,
+                "records": sum(result.record_count for result in completed),
+                "errors": sum(len(result.errors) for result in completed),
+                "preview": preview,
+            }
+
+    def to_store(self):
+        """
+        已完成文件的记录，按合并顺序排列；运行中调用时得到部分结果。
+        设置了 store 时直接返回它，否则将各文件的记录放入新的 RecordStore
+        """
+        if self.store is not None:
+            return self.store
+        store = RecordStore()
+        for result in self.finished_results():
+            store.extend_rows(result.records)
+        return store
+
+    def iter_ranked_rows(self):
+        """已完成文件的 (合并顺序中的位置, 记录元组)，顺序与 to_store 相同；用于按重复记录索引过滤"""
+        if self.store is not None:
+            yield from self.store.iter_group_rows()
+            return
+        with self._lock:
+            finished = sorted((self._ranks[index], result) for index, result in enumerate(self.results)
+                              if result is not None and result.finished)
+        # 经过 RecordStore，数值字段与 to_store 的结果一致
+        store = RecordStore()
+        for _, result in finished:
+            store.extend_rows(result.records)
+        rows = store.iter_rows()
+        for rank, result in finished:
+            for row in islice(rows, len(result.records)):
+                yield rank, row
@@ -0,0 +1,252 @@
+"""
+提取器与结果输出的基准测试，以及提取结果的基准校验 (golden check)。
+
+示例：
+    python benchmark.py --files 2 --rows 5000                 # 测速：行/秒、峰值内存、输出耗时
+    python benchmark.py --check-golden                        # 校验提取结果与 golden_records.json 一致
+    python benchmark.py --update-golden                       # 有意修改提取规则后更新基准结果
+    python benchmark.py --rows 20000 --json bench.json        # 结果另存为 JSON
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from extractors import EXTRACTOR_VERSION, create_extractor, open_workbook
+from parallel import extract_file
+from record_store import RecordStore
+from synthetic import generate
+from writers import OUTPUT_FORMATS, save_to_output
+
+# ============================
+# 基准校验
+# ============================
+#
+# 用固定参数和种子生成的工作簿提取记录，每个工作表的记录元组序列计算一个摘要，与仓库中的
+# golden_records.json 比较。所有读取方式 / 处理引擎组合都必须得到相同的摘要，性能优化不能改变记录。
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_records.json")
+
+GOLDEN_CASES = [
+    {"rows": 300, "groups": 3, "blocks": 3, "seed": 0},
+    {"rows": 200, "groups": 5, "blocks": 4, "seed": 7},
+]
+
+# (读取方式, 流式读取, 绕肉/制作表处理引擎)
+VARIANTS = [
+    ("openpyxl", True, "row"),
+    ("openpyxl", False, "row"),
+    ("openpyxl", True, "grid"),
+    ("lxml", True, "row"),
+    ("lxml", True, "grid"),
+]
+
+
+def records_digest(records):
+    """记录元组序列的摘要；repr 区分 0 与 0.0、None 与空字符串"""
+    digest = hashlib.sha256()
+    for record in records:
+        digest.update(repr(tuple(record)).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def sheet_digests(path, backend="openpyxl", streaming=True, engine="row"):
+    """提取一个工作簿，返回 {工作表名: {"records": 记录数, "digest": 摘要}}"""
+    with open(path, "rb") as f:
+        records, errors, stats = extract_file(f.read(), streaming=streaming, engine=engine, backend=backend)
+    if errors:
+        raise RuntimeError(f"{path}: {errors}")
+    result = {}
+    offset = 0
+    for entry in stats:
+        count = entry["records"]
+        result[entry["sheet"]] = {"records": count, "digest": records_digest(records[offset:offset + count])}
+        offset += count
+    return result
+
+
+def compute_golden(work_dir, variants=VARIANTS):
+    """生成基准用例并用各组合提取，返回 (基准结果, 不一致列表)；基准结果取第一个组合"""
+    golden = {"extractor_version": EXTRACTOR_VERSION, "cases": []}
+    mismatches = []
+    for index, case in enumerate(GOLDEN_CASES):
+        path = generate(os.path.join(work_dir, f"case{index}"), files=1, **case)[0]
+        expected = sheet_digests(path, *variants[0])
+        golden["cases"].append(dict(case, sheets=expected))
+        for variant in variants[1:]:
+            if sheet_digests(path, *variant) != expected:
+                mismatches.append(f"用例 {index} 的提取结果与组合 {variants[0]} 不一致: {variant}")
+    return golden, mismatches
+
+
+def check_golden(update=False):
+    """校验（或更新）基准结果，返回错误信息列表"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        golden, problems = compute_golden(work_dir)
+    if update:
+        if problems:
+            return problems
+        with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+            json.dump(golden, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        return []
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        expected = json.load(f)
+    for index, (case, expected_case) in enumerate(zip(golden["cases"], expected["cases"])):
+        for sheet_name, entry in expected_case["sheets"].items():
+            actual = case["sheets"].get(sheet_name)
+            if actual != entry:
+                problems.append(f"用例 {index} 工作表 '{sheet_name}': 期望 {entry}，实际 {actual}")
+    if len(golden["cases"]) != len(expected["cases"]):
+        problems.append("基准用例数量与 golden_records.json 不一致，请运行 --update-golden")
+    return problems
+
+
+# ============================
+# 基准测试
+# ============================
+
+
+def _measure(func, memory=True):
+    """运行 func，返回 (结果, 耗时秒数, 峰值内存字节数或 None)；内存单独测一次，避免 tracemalloc 影响耗时"""
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, seconds, peak
+
+
+def _extract_sheet(path, sheet_name, backend, streaming, engine):
+    wb = open_workbook(path, streaming=streaming, backend=backend)
+    try:
+        extractor = create_extractor(sheet_name, engine)
+        records = []
+        extractor.extract(wb[sheet_name], records)
+        return extractor, records
+    finally:
+        wb.close()
+
+
+def bench_extractors(paths, variants=VARIANTS, memory=True):
+    """按 (组合, 提取器) 汇总：扫描行数、记录数、耗时、行/秒、峰值内存"""
+    results = []
+    for backend, streaming, engine in variants:
+        totals = {}
+        for path in paths:
+            wb = open_workbook(path, streaming=True, backend=backend)
+            sheet_names = list(wb.sheetnames)
+            wb.close()
+            for sheet_name in sheet_names:
+                (extractor, records), seconds, peak = _measure(
+                    lambda: _extract_sheet(path, sheet_name, backend, streaming, engine), memory)
+                entry = totals.setdefault(type(extractor).__name__, {
+                    "backend": backend, "streaming": streaming, "engine": engine,
+                    "extractor": type(extractor).__name__,
+                    "rows": 0, "records": 0, "seconds": 0.0, "peak_mb": 0.0,
+                })
+                entry["rows"] += extractor.rows_scanned
+                entry["records"] += len(records)
+                entry["seconds"] += seconds
+                if peak is not None:
+                    entry["peak_mb"] = max(entry["peak_mb"], peak / (1024 * 1024))
+        for entry in totals.values():
+            entry["rows_per_sec"] = round(entry["rows"] / entry["seconds"]) if entry["seconds"] else None
+            entry["seconds"] = round(entry["seconds"], 3)
+            entry["peak_mb"] = round(entry["peak_mb"], 1) if memory else None
+            results.append(entry)
+    return results
+
+
+def bench_writers(paths, memory=True):
+    """对全部文件的提取结果测量 save_to_output 各输出格式的耗时、峰值内存和文件大小"""
+    store = RecordStore()
+    for path in paths:
+        with open(path, "rb") as f:
+            store.extend_rows(extract_file(f.read())[0])
+    results = []
+    for fmt in OUTPUT_FORMATS:
+        try:
+            buffer, seconds, peak = _measure(lambda: save_to_output(store, fmt), memory)
+        except ImportError as e:
+            results.append({"format": fmt, "error": str(e)})
+            continue
+        results.append({
+            "format": fmt,
+            "records": len(store),
+            "seconds": round(seconds, 3),
+            "records_per_sec": round(len(store) / seconds) if seconds else None,
+            "peak_mb": round(peak / (1024 * 1024), 1) if peak is not None else None,
+            "size_mb": round(len(buffer.getbuffer()) / (1024 * 1024), 2),
+        })
+    return results
+
+
+def _print_table(rows, columns):
+    widths = {column: max(len(column), *(len(str(row.get(column))) for row in rows)) for column in columns}
+    print("  ".join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(str(row.get(column)).ljust(widths[column]) for column in columns))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="提取器与结果输出的基准测试")
+    parser.add_argument("--files", type=int, default=1, help="生成的文件数")
+    parser.add_argument("--rows", type=int, default=2000, help="每个工作表的人员行数")
+    parser.add_argument("--groups", type=int, default=3, help="绕肉/制作表每个表头段的列组数")
+    parser.add_argument("--blocks", type=int, default=3, help="包装/挑选表每行的 8 列块数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--no-memory", action="store_true", help="不测量峰值内存（省去第二遍运行）")
+    parser.add_argument("--data-dir", help="生成的工作簿保存目录，默认使用临时目录并在结束后删除")
+    parser.add_argument("--json", help="将结果另存为 JSON")
+    parser.add_argument("--check-golden", action="store_true", help="只校验提取结果与 golden_records.json 一致")
+    parser.add_argument("--update-golden", action="store_true", help="重新生成 golden_records.json")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.check_golden or args.update_golden:
+        problems = check_golden(update=args.update_golden)
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        if not problems:
+            print("基准结果已更新" if args.update_golden else "提取结果与基准一致")
+        return 1 if problems else 0
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        data_dir = args.data_dir or work_dir
+        start = time.perf_counter()
+        paths = generate(data_dir, args.files, args.rows, args.groups, args.blocks, args.seed)
+        print(f"生成 {len(paths)} 个工作簿，耗时 {time.perf_counter() - start:.1f} 秒", file=sys.stderr)
+
+        memory = not args.no_memory
+        extractor_results = bench_extractors(paths, memory=memory)
+        writer_results = bench_writers(paths, memory=memory)
+
+    _print_table(extractor_results, ["backend", "streaming", "engine", "extractor", "rows", "records",
+                                     "seconds", "rows_per_sec", "peak_mb"])
+    print()
+    _print_table(writer_results, ["format", "records", "seconds", "records_per_sec", "peak_mb", "size_mb"])
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"params": vars(args), "extractors": extractor_results, "writers": writer_results},
+                      f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
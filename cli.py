@@ -0,0 +1,292 @@
+"""
+车间日报批量处理命令行入口（不依赖 Streamlit，可用于定时任务）。
+
+示例：
+    python cli.py /mnt/share/日报 -o 生产车间统计数据收集.xlsx --workers 4 --summary summary.json
+    python cli.py "/mnt/share/日报/*2024-03*.xlsx" -o march.csv
+    python cli.py /mnt/share/日报 -o month.xlsx --db workshop_records.sqlite3 --start 2024-03-01 --end 2024-03-31
+    python cli.py /mnt/share/全年日报 -o year.csv --memory-limit-mb 256
+    python cli.py /mnt/share/日报 -o month.xlsx --duplicates keep-latest
+    python cli.py 三月日报.zip -o march.xlsx --workers 4
+"""
+import argparse
+import glob
+import json
+import mmap
+import os
+import sys
+import time
+from datetime import datetime
+from itertools import islice
+
+from aggregation import aggregate
+from archive import ReportArchive, is_archive
+from dedup import (CONFLICT_SHEET, MODIFIED_TIME, POLICIES, DeduplicatedRecords, DuplicateIndex, index_files,
+                   ranked_file_rows)
+from extractors import BACKENDS, ENGINES, EXTRACTOR_VERSION, is_report_file
+from incremental import RecordDatabase, parse_date
+from ingest import SPILL_THRESHOLD_BYTES
+from instrumentation import configure_logging
+from parallel import default_workers
+from pipeline import merge_ranks, ordered, process_files, run_stats
+from record_store import RecordStore, SpillingRecordStore
+from sheet_selection import SheetFilter, parse_patterns
+from writers import OUTPUT_FORMATS, write_output
+
+# 与上传组件一致的文件类型
+INPUT_EXTENSIONS = (".xlsx", ".xls", ".zip")
+
+
+def collect_inputs(inputs):
+    """将目录、通配符和文件路径展开为去重后的文件列表（目录不递归）"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = sorted(os.path.join(item, name) for name in os.listdir(item))
+        elif glob.has_magic(item):
+            candidates = sorted(glob.glob(item))
+        else:
+            candidates = [item]
+        for path in candidates:
+            if os.path.isfile(path) and path.lower().endswith(INPUT_EXTENSIONS) and path not in paths:
+                paths.append(path)
+    return paths
+
+
+def expand_archives(paths):
+    """
+    将压缩包展开为其中的工作簿（不解压），返回 ([(显示路径, 文件名, 来源), ...], 无法打开的压缩包, 已打开的压缩包)。
+    普通文件的来源为文件路径，压缩包成员的来源为 archive.ArchiveMember
+    """
+    entries = []
+    failed = []
+    archives = []
+    for path in paths:
+        if not is_archive(path):
+            entries.append((path, os.path.basename(path), path))
+            continue
+        try:
+            archive = ReportArchive(path)
+        except Exception as e:
+            failed.append({"file": path, "reason": f"无法打开压缩包: {e}"})
+            continue
+        archives.append(archive)
+        entries.extend((os.path.join(path, member.path), member.name, member) for member in archive.members())
+    return entries, failed, archives
+
+
+def map_file(path):
+    """只读映射文件内容：按需读入内存，可被系统回收"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def date_argument(text):
+    """--start/--end 的取值，无法识别的日期由 argparse 报错退出"""
+    try:
+        return parse_date(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="批量提取车间生产日报数据")
+    parser.add_argument("inputs", nargs="+", help="输入目录、文件或通配符")
+    parser.add_argument("-o", "--output", required=True, help="输出文件路径")
+    parser.add_argument("-f", "--format", choices=list(OUTPUT_FORMATS),
+                        help="输出格式，默认按输出文件扩展名判断")
+    parser.add_argument("-w", "--workers", type=int, default=default_workers(), help="并行进程数，1 表示逐个处理")
+    parser.add_argument("--per-sheet", action="store_true", help="按工作表分发并行任务")
+    parser.add_argument("--no-streaming", action="store_true", help="关闭只读流式解析")
+    parser.add_argument("--backend", choices=BACKENDS, default="openpyxl",
+                        help="工作簿读取方式：openpyxl，或 lxml 直接流式解析工作表 XML（仅 xlsx）")
+    parser.add_argument("--engine", choices=ENGINES, default="row",
+                        help="绕肉/制作表的处理引擎：row 逐行处理，grid 整表按列组批量计算")
+    parser.add_argument("--spill-mb", type=int, default=SPILL_THRESHOLD_BYTES // (1024 * 1024),
+                        help="超过该大小 (MB) 的文件写入临时文件后解析")
+    parser.add_argument("--include-sheets", default="",
+                        help="只处理名称匹配的工作表，逗号分隔，可用 * ? 通配符")
+    parser.add_argument("--exclude-sheets", default="",
+                        help="不处理名称匹配的工作表，逗号分隔，可用 * ? 通配符")
+    parser.add_argument("--probe-rows", type=int, default=0,
+                        help="前 N 行中没有人员姓名的工作表不处理，0 表示不预检")
+    parser.add_argument("--no-aggregate", action="store_true",
+                        help="不在 xlsx 输出中附加按人员/车间/日期/产品的汇总表")
+    parser.add_argument("--duplicates", choices=["off"] + list(POLICIES), default="report-only",
+                        help="同一 (日期, 姓名, 车间, 产品, 批次号) 出现在多个文件中时的处理方式："
+                             "report-only 只报告，keep-latest/keep-first 保留修改时间最新/最早的文件的记录"
+                             "（压缩包成员按压缩包中记录的修改时间，--db 模式按入库时间）；"
+                             "xlsx 输出附加“重复记录”工作表")
+    parser.add_argument("--memory-limit-mb", type=int, default=0,
+                        help="限制内存：记录超过该大小 (MB) 时分块写入临时文件，输入文件按需映射读取；0 表示不限制")
+    parser.add_argument("--summary", help="运行摘要 JSON 输出路径，'-' 表示标准输出")
+    parser.add_argument("--log-level", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="日志级别，DEBUG 会输出每个表头行")
+    parser.add_argument("--db", help="增量模式：SQLite 数据库路径，已入库的文件不再解析")
+    parser.add_argument("--start", type=date_argument, help="增量模式下结果表的起始日期，如 2024-03-01")
+    parser.add_argument("--end", type=date_argument, help="增量模式下结果表的结束日期，如 2024-03-31")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging(args.log_level)
+    started = time.time()
+    started_at = datetime.now().isoformat(timespec="seconds")
+
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip(".").lower()
+    if fmt not in OUTPUT_FORMATS:
+        print(f"无法根据输出文件名判断格式，请使用 --format 指定 ({'/'.join(OUTPUT_FORMATS)})", file=sys.stderr)
+        return 2
+    if args.start is not None and args.end is not None and args.start > args.end:
+        print(f"起始日期 {args.start} 晚于结束日期 {args.end}", file=sys.stderr)
+        return 2
+
+    entries, failed_archives, archives = expand_archives(collect_inputs(args.inputs))
+    targets = [entry for entry in entries if is_report_file(entry[1])]
+    skipped = [path for path, name, _ in entries if not is_report_file(name)]
+
+    bounded = args.memory_limit_mb > 0
+    files = []
+    # 每个文件的修改时间，重复记录按此判断新旧
+    modified = []
+    for _, name, source in targets:
+        if not isinstance(source, str):
+            # 压缩包成员在解析时才解压
+            files.append((name, source))
+            modified.append(source.modified or 0.0)
+            continue
+        modified.append(os.path.getmtime(source))
+        if bounded:
+            files.append((name, map_file(source)))
+        else:
+            with open(source, "rb") as f:
+                files.append((name, f.read()))
+
+    database = RecordDatabase(args.db) if args.db else None
+    # 限制内存时每个文件的记录完成后即转存（增量模式下已写入数据库），不在结果中保留
+    store = SpillingRecordStore(args.memory_limit_mb * 1024 * 1024) if bounded and database is None else None
+    # 增量模式的重复检查在生成结果表时按日期范围对数据库中的文件进行
+    duplicates = DuplicateIndex(MODIFIED_TIME) if args.duplicates != "off" and database is None else None
+    ranks = merge_ranks([name for name, _ in files])
+
+    def on_result(index, result):
+        if duplicates is not None:
+            timestamp = modified[index]
+            label = datetime.fromtimestamp(timestamp).isoformat(sep=" ", timespec="seconds") if timestamp else "未知"
+            duplicates.add_file(ranks[index], result.name, result.records, modified[index], label)
+        if store is not None:
+            store.extend_rows(result.records, group=ranks[index])
+        if bounded:
+            result.release_records()
+
+    def ranked_rows():
+        """(合并顺序中的位置, 记录元组)，顺序与输出相同，用于按重复记录索引过滤"""
+        if store is not None:
+            return store.iter_group_rows()
+        rows = records.iter_rows()
+        return ((ranks[index], row) for index in sorted(range(len(results)), key=ranks.__getitem__)
+                for row in islice(rows, len(results[index].records)))
+
+    sheet_filter = SheetFilter(parse_patterns(args.include_sheets), parse_patterns(args.exclude_sheets),
+                               args.probe_rows)
+    results = process_files(files, workers=args.workers, per_sheet=args.per_sheet,
+                            streaming=not args.no_streaming, spill_threshold=args.spill_mb * 1024 * 1024,
+                            database=database, engine=args.engine, backend=args.backend,
+                            sheet_filter=sheet_filter if sheet_filter.active else None, on_result=on_result)
+
+    if database is not None:
+        record_count = database.count(args.start, args.end)
+        source = database.query(args.start, args.end)
+        if args.duplicates != "off":
+            duplicates = index_files(database.query_files(args.start, args.end))
+    elif store is not None:
+        source = store
+        record_count = len(store)
+    else:
+        source = records = RecordStore()
+        for result in ordered(results):
+            records.extend_rows(result.records)
+        record_count = len(source)
+
+    duplicate_summary = None
+    if duplicates is not None:
+        exact, conflicting = duplicates.counts()
+        duplicate_summary = {"policy": args.duplicates, "basis": duplicates.basis, "keys": len(duplicates),
+                             "exact": exact, "conflicting": conflicting,
+                             "dropped": duplicates.dropped(args.duplicates)}
+        if args.duplicates != "report-only":
+            if database is not None:
+                source = DeduplicatedRecords(lambda: ranked_file_rows(database.query_files(args.start, args.end)),
+                                             duplicates, args.duplicates)
+            else:
+                source = DeduplicatedRecords(ranked_rows, duplicates, args.duplicates)
+            record_count = len(source)
+
+    # 汇总表只写入 xlsx
+    summaries = None
+    aggregate_seconds = 0.0
+    if fmt == "xlsx" and not args.no_aggregate and record_count:
+        aggregate_start = time.perf_counter()
+        summaries = aggregate(source)
+        aggregate_seconds = time.perf_counter() - aggregate_start
+        if database is not None and not isinstance(source, DeduplicatedRecords):
+            # 数据库的查询结果是生成器，已在汇总时读完，写出前重新查询
+            source = database.query(args.start, args.end)
+    if fmt == "xlsx" and duplicates is not None and len(duplicates):
+        summaries = dict(summaries or {})
+        summaries[CONFLICT_SHEET] = duplicates.conflict_table(args.duplicates)
+
+    with open(args.output, "wb") as f:
+        write_output(source, f, fmt, summaries)
+    if store is not None:
+        store.close()
+    for archive in archives:
+        archive.close()
+
+    file_summaries = []
+    for (path, _, _), result in zip(targets, results):
+        file_summaries.append({
+            "file": path,
+            "fingerprint": result.fingerprint,
+            "source": result.source,
+            "status": "error" if result.failed else "ok",
+            "records": result.record_count,
+            "seconds": round(result.seconds, 4),
+            "errors": [{"sheet": sheet_name, "message": message} for sheet_name, message in result.errors],
+            "skipped_sheets": [{"sheet": sheet_name, "reason": reason}
+                               for sheet_name, reason in result.skipped_sheets()],
+        })
+    summary = {
+        "started_at": started_at,
+        "elapsed_seconds": round(time.time() - started, 3),
+        "extractor_version": EXTRACTOR_VERSION,
+        "output": args.output,
+        "format": fmt,
+        "record_count": record_count,
+        "summary_sheets": list(summaries or {}),
+        "aggregate_seconds": round(aggregate_seconds, 4),
+        "duplicates": duplicate_summary,
+        "files": file_summaries,
+        "skipped": [{"file": path, "reason": "文件名不包含关键字"} for path in skipped] + failed_archives,
+        "sheets": run_stats(results),
+    }
+    if args.summary == "-":
+        json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    elif args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    for entry in failed_archives:
+        print(f"{entry['file']}: {entry['reason']}", file=sys.stderr)
+    has_errors = bool(failed_archives) or any(result.errors for result in results)
+    print(f"处理 {len(targets)} 个文件（跳过 {len(skipped)} 个），共 {record_count} 条记录 → {args.output}",
+          file=sys.stderr)
+    return 1 if has_errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+import hashlib
+import threading
+
+import pandas as pd
+
+from extractors import RECORD_FIELDS
+
+# ============================
+# 重复记录检查
+# ============================
+#
+# 同一天的日报常被重复上传，或者更正后的版本与原版本一起上传，两份记录都会进入结果表，
+# 工资被算两次。每个文件完成时，其记录按 (日期, 姓名, 车间名称, 产品名称, 批次号) 写入哈希索引；
+# 同一个键出现在多个文件中即为重复：各文件中该键的记录完全相同为“完全重复”，否则为“数据不一致”。
+# 只比较不同文件之间的记录，同一文件内同一个键的多条记录视为正常数据。
+#
+# 输出时按处理方式过滤：保留最新或最早的文件中该键的记录，或只报告不删除。文件的新旧由调用方明确给出：
+# 页面按上传顺序（后上传的较新），命令行按文件修改时间（压缩包成员为其在压缩包中记录的修改时间），
+# 增量模式按入库时间；新旧相同时取合并顺序中靠后（保留最新时）或靠前（保留最早时）的文件。
+# 更正版本的文件名常常排在原版本之前（如“日报_0301(更正).xlsx”），因此不能用文件名顺序判断新旧。
+# 重复的键写入“重复记录”工作表，每行注明该文件的新旧依据、保留的文件和原因。
+
+KEY_FIELDS = ["日期", "姓名", "车间名称", "产品名称", "批次号"]
+
+# 处理方式 → 说明
+POLICIES = {
+    "report-only": "只报告，不删除记录",
+    "keep-latest": "保留最新文件的记录",
+    "keep-first": "保留最早文件的记录",
+}
+
+# 文件新旧的依据
+UPLOAD_ORDER = "上传顺序"
+MODIFIED_TIME = "修改时间"
+INGESTED_TIME = "入库时间"
+
+CONFLICT_SHEET = "重复记录"
+CONFLICT_COLUMNS = KEY_FIELDS + ["文件", "新旧依据", "记录数", "数量合计", "金额合计", "类型", "处理", "保留文件", "原因"]
+
+EXACT = "完全重复"
+CONFLICT = "数据不一致"
+
+_KEY_INDEXES = [RECORD_FIELDS.index(field) for field in KEY_FIELDS]
+_VALUE_INDEXES = [index for index in range(len(RECORD_FIELDS)) if index not in _KEY_INDEXES]
+_QUANTITY_INDEX = RECORD_FIELDS.index("数量")
+_AMOUNT_INDEX = RECORD_FIELDS.index("金额")
+
+
+def record_key(row):
+    return tuple(row[index] for index in _KEY_INDEXES)
+
+
+def _number(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _entry(rows):
+    """一个文件中同一个键的全部记录 → (非键字段摘要, 记录数, 数量合计, 金额合计)；摘要与记录顺序无关"""
+    values = sorted(repr(tuple(row[index] for index in _VALUE_INDEXES)) for row in rows)
+    digest = hashlib.blake2b("\n".join(values).encode("utf-8"), digest_size=16).digest()
+    return (digest, len(rows), sum(_number(row[_QUANTITY_INDEX]) for row in rows),
+            sum(_number(row[_AMOUNT_INDEX]) for row in rows))
+
+
+class DuplicateIndex:
+    """
+    跨文件的重复记录索引。
+
+    add_file 按文件调用，rank 为文件在合并顺序中的位置，同一文件只能加入一次。
+    只出现在一个文件中的键只保存文件位置和摘要；出现在多个文件中的键才保存各文件的明细。
+
+    basis: 文件新旧的依据（UPLOAD_ORDER、MODIFIED_TIME 或 INGESTED_TIME），写入重复记录表
+    """
+
+    def __init__(self, basis=UPLOAD_ORDER):
+        self.basis = basis
+        self.total = 0
+        self._files = {}  # 文件位置 -> (文件名, 新旧, 新旧的显示文字)
+        self._single = {}  # 键 -> (文件位置, 条目)
+        self._multi = {}  # 键 -> {文件位置: 条目}
+        self._lock = threading.Lock()
+
+    def add_file(self, rank, file_name, rows, recency, label=None):
+        """
+        recency: 按 basis 的新旧，可比较大小，越大越新（如上传序号、修改时间戳、入库时间字符串）
+        label: recency 在重复记录表中的显示文字，默认为 str(recency)
+        """
+        groups = {}
+        for row in rows:
+            groups.setdefault(record_key(row), []).append(row)
+        with self._lock:
+            self._files[rank] = (file_name, recency, str(recency) if label is None else label)
+            for key, key_rows in groups.items():
+                self.total += len(key_rows)
+                entry = _entry(key_rows)
+                entries = self._multi.get(key)
+                if entries is not None:
+                    entries[rank] = entry
+                    continue
+                first = self._single.pop(key, None)
+                if first is None:
+                    self._single[key] = (rank, entry)
+                else:
+                    self._multi[key] = {first[0]: first[1], rank: entry}
+
+    def finish(self):
+        """
+        全部文件加入后调用：只出现在一个文件中的键不再需要，释放其条目，之后不能再加入文件。
+        索引只保留重复的键，占用的内存只取决于重复记录的数量
+        """
+        with self._lock:
+            self._single = None
+
+    def __len__(self):
+        """重复的键数"""
+        return len(self._multi)
+
+    def counts(self):
+        """(完全重复的键数, 数据不一致的键数)"""
+        with self._lock:
+            exact = sum(len({entry[0] for entry in entries.values()}) == 1 for entries in self._multi.values())
+            return exact, len(self._multi) - exact
+
+    def _newness(self, rank):
+        """比较新旧用的键：新旧相同时按合并顺序"""
+        return self._files[rank][1], rank
+
+    def owners(self, policy):
+        """{重复的键: 保留其记录的文件位置}；只报告时为空"""
+        if policy == "report-only":
+            return {}
+        choose = max if policy == "keep-latest" else min
+        with self._lock:
+            return {key: choose(entries, key=self._newness) for key, entries in self._multi.items()}
+
+    def _reason(self, policy, owner, entries):
+        """保留 owner 的原因"""
+        latest = policy == "keep-latest"
+        reason = f"{self.basis}{'最新' if latest else '最早'}"
+        recency = self._files[owner][1]
+        if sum(self._files[rank][1] == recency for rank in entries) > 1:
+            reason += f"（{self.basis}相同，取合并顺序中{'最后' if latest else '最先'}的文件）"
+        return reason
+
+    def dropped(self, policy):
+        """按处理方式删除的记录数"""
+        owners = self.owners(policy)
+        with self._lock:
+            return sum(entry[1] for key, owner in owners.items()
+                       for rank, entry in self._multi[key].items() if rank != owner)
+
+    def conflict_table(self, policy):
+        """重复记录工作表：每个重复的键在每个文件中一行"""
+        owners = self.owners(policy)
+        rows = []
+        with self._lock:
+            for key, entries in self._multi.items():
+                kind = EXACT if len({entry[0] for entry in entries.values()}) == 1 else CONFLICT
+                owner = owners.get(key)
+                if owner is None:
+                    kept, reason = "", POLICIES["report-only"]
+                else:
+                    kept, reason = self._files[owner][0], self._reason(policy, owner, entries)
+                for rank in sorted(entries):
+                    file_name, _, label = self._files[rank]
+                    _, count, quantity, amount = entries[rank]
+                    action = "保留" if owner is None or owner == rank else "删除"
+                    rows.append(key + (file_name, f"{self.basis} {label}", count, quantity, amount, kind, action,
+                                       kept, reason))
+        table = pd.DataFrame(rows, columns=CONFLICT_COLUMNS)
+        if rows:
+            table = table.sort_values(KEY_FIELDS + ["文件"], key=lambda column: column.map(repr), kind="stable")
+        return table.reset_index(drop=True)
+
+
+class DeduplicatedRecords:
+    """
+    按处理方式过滤后的记录来源，可交给 writers 和 aggregation。
+
+    ranked_rows: 无参数的函数，返回按合并顺序排列的 (文件位置, 记录元组)，与建立索引时的文件位置一致
+    """
+
+    def __init__(self, ranked_rows, index, policy):
+        self._ranked_rows = ranked_rows
+        self._owners = index.owners(policy)
+        self._length = index.total - index.dropped(policy)
+
+    def __len__(self):
+        return self._length
+
+    def iter_rows(self):
+        owners = self._owners
+        for rank, row in self._ranked_rows():
+            if owners:
+                owner = owners.get(record_key(row))
+                if owner is not None and owner != rank:
+                    continue
+            yield row
+
+
+def index_files(files, basis=INGESTED_TIME):
+    """
+    由 [(文件名, 新旧, 记录元组列表), ...]（按合并顺序，如 incremental.RecordDatabase.query_files 的结果）
+    建立索引，文件位置为序号
+    """
+    index = DuplicateIndex(basis)
+    for rank, (file_name, recency, rows) in enumerate(files):
+        index.add_file(rank, file_name, rows, recency)
+    index.finish()
+    return index
+
+
+def ranked_file_rows(files):
+    """[(文件名, 新旧, 记录元组列表), ...] → (序号, 记录元组)，与 index_files 的文件位置一致"""
+    for rank, (_, _, rows) in enumerate(files):
+        for row in rows:
+            yield rank, row
@@ -0,0 +1,662 @@
+import logging
+
+from openpyxl import load_workbook
+from openpyxl.worksheet._read_only import ReadOnlyWorksheet
+from datetime import date, datetime, timedelta
+import re
+from collections import deque
+from functools import lru_cache
+from itertools import chain, compress, islice
+
+logger = logging.getLogger(__name__)
+
+# ============================
+# 原有的核心逻辑类 (保持不变)
+# ============================
+
+class DateParser:
+    # 日期格式按顺序尝试，正则在导入时预编译
+    FORMATS = [
+        (re.compile(r"\d{4}[-/]\d{1,2}[-/]\d{1,2}"), "%Y-%m-%d"),
+        (re.compile(r"\d{4}年\d{1,2}月\d{1,2}日"), "%Y年%m月%d日"),
+        (re.compile(r"\d{2}年\d{1,2}月\d{1,2}日"), "%y年%m月%d日"),
+        (re.compile(r"\d{1,2}月\d{1,2}日"), "%m月%d日"),
+        (re.compile(r"\d{4}-\d{1,2}-\d{1,2} \d{1,2}:\d{1,2}:\d{1,2}"), "%Y-%m-%d")
+    ]
+    # 解析结果缓存的条目上限（同一批报表中的日期文本和 Excel 序号高度重复）
+    CACHE_SIZE = 4096
+
+    @staticmethod
+    def parse(date_str):
+        if not date_str:
+            return None
+        if isinstance(date_str, date):
+            # datetime/date 单元格：str() 后总是命中第一个格式，结果就是其自身的日期
+            return date_str.strftime("%Y/%m/%d")
+        if isinstance(date_str, (int, float)):
+            return _parse_excel_number_cached(date_str)
+        date_str = str(date_str).strip()
+        # 所有格式都以数字开头，姓名、标题等文本无需进入缓存和正则匹配
+        if not date_str[:1].isdigit():
+            return None
+        return _parse_text_cached(date_str)
+
+    @staticmethod
+    def parse_many(values):
+        """批量解析一列取值，返回与输入等长的列表；同一批中相同的取值只解析一次"""
+        parsed = {}
+        results = []
+        for value in values:
+            key = (type(value), value)
+            if key not in parsed:
+                parsed[key] = DateParser.parse(value)
+            results.append(parsed[key])
+        return results
+
+    @staticmethod
+    def _parse_text(date_str):
+        for pattern, fmt in DateParser.FORMATS:
+            if pattern.match(date_str):
+                try:
+                    dt = datetime.strptime(date_str.split()[0] if " " in date_str else date_str, fmt)
+                    return dt.strftime("%Y/%m/%d")
+                except ValueError:
+                    continue
+        return None
+
+    @staticmethod
+    def _parse_excel_number(num):
+        try:
+            base_date = datetime(1899, 12, 30)
+            delta = timedelta(days=int(num))
+            return (base_date + delta).strftime("%Y/%m/%d")
+        except (ValueError, TypeError):
+            return None
+
+
+_parse_text_cached = lru_cache(maxsize=DateParser.CACHE_SIZE)(DateParser._parse_text)
+_parse_excel_number_cached = lru_cache(maxsize=DateParser.CACHE_SIZE)(DateParser._parse_excel_number)
+
+
+class DataValidator:
+    @staticmethod
+    def is_valid_name(name):
+        if not name or not isinstance(name, str):
+            return False
+        name = name.strip()
+        return (name and len(name) >= 2 and
+                name not in ["姓名", "合计", "序号", None, "日期", "优萌宠物车间生产日报表", "生产日报表"])
+
+    @staticmethod
+    def is_valid_number(value):
+        try:
+            float(value)
+            return True
+        except (TypeError, ValueError):
+            return False
+
+    @staticmethod
+    def validate_record(record):
+        required_fields = ["日期", "姓名", "产品名称"]
+        for field in required_fields:
+            if not record.get(field):
+                return False
+        return True
+
+
+class WorkshopDataExtractor:
+    # 回看缓冲区保留的行数（表头行需要读取上一行的批次号/产品名称）
+    LOOKBACK_ROWS = 5
+    # 开始逐行处理前用于查找日期、批次号的行数
+    METADATA_ROWS = 10
+
+    def __init__(self, sheet_name):
+        self.sheet_name = sheet_name
+        self.current_date = None
+        self.current_batch = "0"
+        self.current_products = []
+        self.headers = []
+        self.previous_rows = deque(maxlen=self.LOOKBACK_ROWS)
+        # 统计信息：扫描行数、表头行数、产生记录的行数
+        self.rows_scanned = 0
+        self.header_rows = 0
+        self.rows_with_records = 0
+        self.date_pattern = re.compile(r'(\d{4}[-/年]\d{1,2}[-/月]\d{1,2}日?)')
+
+    @property
+    def rows_skipped(self):
+        """既不是表头、也没有产生记录的行数"""
+        return self.rows_scanned - self.header_rows - self.rows_with_records
+
+    def extract(self, ws, data_list):
+        logger.info("[%s车间] 开始处理工作表", self.sheet_name)
+        ensure_dimensions(ws)
+        self.extract_rows(ws.iter_rows(values_only=True), data_list)
+
+    def extract_rows(self, rows, data_list):
+        """逐行处理单元格值元组，只在内存中保留最近几行，适用于只读(流式)工作表"""
+        rows = iter(rows)
+        head = list(islice(rows, self.METADATA_ROWS))
+        self._find_initial_metadata(head)
+        self.previous_rows.clear()
+        for row in chain(head, rows):
+            count = len(data_list)
+            self._process_row(row, data_list)
+            self.rows_scanned += 1
+            if len(data_list) != count:
+                self.rows_with_records += 1
+            self.previous_rows.append(row)
+
+    def _find_initial_metadata(self, rows):
+        for row in rows:
+            for value in row:
+                if value:
+                    date_match = self.date_pattern.search(str(value))
+                    if date_match:
+                        self.current_date = DateParser.parse(date_match.group())
+                    if isinstance(value, str):
+                        cell_value = str(value).strip()
+                        if '批次号：' in cell_value:
+                            self.current_batch = cell_value.split('：', 1)[-1].strip() or "0"
+                        elif '批号：' in cell_value:
+                            self.current_batch = cell_value.split('：', 1)[-1].strip() or "0"
+
+    def _try_extract_metadata_from_row(self, row):
+        for value in row:
+            if value:
+                parsed_date = DateParser.parse(value)
+                if parsed_date:
+                    self.current_date = parsed_date
+                if isinstance(value, str):
+                    cell_value = str(value).strip()
+                    if '批次号：' in cell_value:
+                        self.current_batch = cell_value.split('：', 1)[-1].strip() or "0"
+                    elif '批号：' in cell_value:
+                        self.current_batch = cell_value.split('：', 1)[-1].strip() or "0"
+
+    def _process_row(self, row, data_list):
+        raise NotImplementedError
+
+    def _create_record(self, name, product, quantity, price, amount, batch=None, note=""):
+        record = {
+            "日期": self.current_date,
+            "姓名": name,
+            "批次号": batch if batch is not None else self.current_batch,
+            "产品名称": product,
+            "数量": float(quantity) if quantity is not None and DataValidator.is_valid_number(quantity) else 0,
+            "计量单位": "",
+            "单价": float(price) if price is not None and DataValidator.is_valid_number(price) else 0,
+            "金额": float(amount) if amount is not None and DataValidator.is_valid_number(amount) else 0,
+            "车间名称": self.sheet_name,
+            "备注": note
+        }
+        if record["金额"] == 0 and record["数量"] and record["单价"]:
+            record["金额"] = record["数量"] * record["单价"]
+        return record if DataValidator.validate_record(record) else None
+
+
+# ============================
+# 绕肉/制作表表头版式
+# ============================
+#
+# 每天的绕肉/制作日报只用少数几种模板。表头行的列组（数量列及其右侧的单价/金额/备注列）只由
+# 行长度和带关键字的单元格的位置、类型决定，与批次号、产品名称无关。以此作为版式指纹，
+# 计算出的列组在进程内缓存，相同模板的表头行不再逐列查找。
+#
+# 缓存只在当前进程的内存中，不写入磁盘，进程结束即失效：逐个处理时在页面服务进程（或一次命令行运行）中
+# 一直保留；并行处理时每次运行都新建进程池，工作进程从空缓存开始，只在该进程处理的各文件之间复用。
+# 计算一个版式只需扫描一遍表头行，一次运行中很快就能填满常用模板，持久化带来的收益抵不上维护成本
+# （提取规则版本变化时失效、多个进程同时写入）。
+
+HEADER_KEYWORDS = ["数量", "单价", "金额", "件数", "价格", "总价", "备注"]
+# 任一关键字；关键字都不含换行，各单元格文本以换行连接后匹配，不会跨单元格命中
+_HEADER_KEYWORD_PATTERN = re.compile("|".join(HEADER_KEYWORDS))
+
+# 表头单元格类型（位标志）：数量列；作为数量列右侧的单元格时按 单价 > 金额 > 备注 的顺序判断
+_QUANTITY, _PRICE, _AMOUNT, _NOTE = 1, 2, 4, 8
+
+# 表头版式缓存（进程内）的条目上限，超过时清空
+HEADER_LAYOUT_CACHE_SIZE = 256
+_header_layouts = {}
+
+
+def has_header_keyword(row):
+    """行中是否有带表头关键字的单元格；关键字都是文字，数值、日期单元格不必检查"""
+    texts = [value for value in row if isinstance(value, str)]
+    return bool(texts) and _HEADER_KEYWORD_PATTERN.search("\n".join(texts)) is not None
+
+
+@lru_cache(maxsize=4096)
+def _header_cell_kind(text):
+    kind = _QUANTITY if "数量" in text or "件数" in text else 0
+    if "单价" in text or "价格" in text:
+        kind |= _PRICE
+    elif "金额" in text or "总价" in text:
+        kind |= _AMOUNT
+    elif "备注" in text:
+        kind |= _NOTE
+    return kind
+
+
+def header_signature(row):
+    """表头行的版式指纹：(行长度, ((列号, 单元格类型), ...))，只包含带关键字的单元格"""
+    return len(row), tuple((i, kind) for i, value in enumerate(row)
+                           if isinstance(value, str) and (kind := _header_cell_kind(value)))
+
+
+def _compute_header_layout(length, cells):
+    kinds = dict(cells)
+    layout = []
+    for q_col, kind in cells:
+        if not kind & _QUANTITY:
+            continue
+        price_col = None
+        amount_col = None
+        note_col = None
+        # 数量列右侧最多 4 列中的关键字，靠右的优先
+        for j in range(q_col + 1, min(q_col + 5, length)):
+            kind = kinds.get(j, 0)
+            if kind & _PRICE:
+                price_col = j
+            elif kind & _AMOUNT:
+                amount_col = j
+            elif kind & _NOTE:
+                note_col = j
+        # 找不到关键字时按 数量、单价、金额、备注 的相邻顺序
+        if price_col is None and q_col + 1 < length:
+            price_col = q_col + 1
+        if amount_col is None and q_col + 2 < length:
+            amount_col = q_col + 2
+        if note_col is None and q_col + 3 < length:
+            note_col = q_col + 3
+        layout.append((q_col, price_col, amount_col, note_col))
+    return tuple(layout)
+
+
+def header_layout(row):
+    """表头行的列组 ((数量列, 单价列, 金额列, 备注列), ...)，列号从 0 开始，找不到的列为 None"""
+    signature = header_signature(row)
+    layout = _header_layouts.get(signature)
+    if layout is None:
+        if len(_header_layouts) >= HEADER_LAYOUT_CACHE_SIZE:
+            _header_layouts.clear()
+        layout = _header_layouts[signature] = _compute_header_layout(*signature)
+    return layout
+
+
+class RaorouExtractor(WorkshopDataExtractor):
+    def _is_header_row(self, row):
+        if len(row) > 1 and DataValidator.is_valid_name(row[1]):
+            return False
+        return has_header_keyword(row)
+
+    def _parse_header_row(self, row):
+        logger.debug("[%s车间] 发现表头行，进行解析。", self.sheet_name)
+        self.header_rows += 1
+        self.current_products = []
+        self.headers = []
+
+        # 表头上一行（批次号、产品名称所在行），第一行没有上一行
+        above = self.previous_rows[-1] if self.previous_rows else None
+
+        for q_col, price_col, amount_col, note_col in header_layout(row):
+            batch = above[q_col] if above is not None and q_col < len(above) else None
+            batch = str(batch).strip() if batch else "0"
+
+            product = None
+            if above is not None and q_col + 1 < len(row) and q_col + 1 < len(above):
+                product = above[q_col + 1]
+            product = str(product).strip() if product else f"产品{len(self.current_products) + 1}"
+
+            if product not in self.current_products:
+                self.current_products.append(product)
+
+            self.headers.append({
+                'col': q_col + 1,
+                'type': '数量',
+                'product': product,
+                'batch': batch
+            })
+
+            if price_col is not None:
+                self.headers.append({
+                    'col': price_col + 1,
+                    'type': '单价',
+                    'product': product
+                })
+
+            if amount_col is not None:
+                self.headers.append({
+                    'col': amount_col + 1,
+                    'type': '金额',
+                    'product': product
+                })
+
+            if note_col is not None:
+                self.headers.append({
+                    'col': note_col + 1,
+                    'type': '备注',
+                    'product': product
+                })
+
+    @staticmethod
+    def _find_product_names(previous_rows):
+        """在回看缓冲区（表头之上最多 5 行）中查找产品名称"""
+        products = []
+        for row in previous_rows:
+            for value in row:
+                if value and isinstance(value, str):
+                    cell_value = str(value).strip()
+                    if '产品名称：' in cell_value:
+                        product = cell_value.split('：', 1)[-1].strip()
+                        if product and product not in products:
+                            products.append(product)
+                    elif '品名：' in cell_value:
+                        product = cell_value.split('：', 1)[-1].strip()
+                        if product and product not in products:
+                            products.append(product)
+
+        if len(products) < 3:
+            products = ["5\"*12g漂白皮卷绕鸭肉", "螺旋三明治", "拆钩子"]
+
+        return products
+
+    def _is_data_row(self, row):
+        return len(row) > 1 and DataValidator.is_valid_name(row[1])
+
+    def _parse_data_row(self, row, data_list):
+        name = row[1] if len(row) > 1 else None
+        if not name or not DataValidator.is_valid_name(name):
+            return
+
+        for i in range(0, len(self.headers), 4):
+            if i + 3 >= len(self.headers):
+                continue
+
+            product_info = self.headers[i]
+            product = product_info['product']
+            batch = product_info.get('batch', "0")
+
+            qty_col = self.headers[i]['col'] - 1
+            price_col = self.headers[i + 1]['col'] - 1 if i + 1 < len(self.headers) else None
+            amount_col = self.headers[i + 2]['col'] - 1 if i + 2 < len(self.headers) else None
+            note_col = self.headers[i + 3]['col'] - 1 if i + 3 < len(self.headers) else None
+
+            qty = row[qty_col] if qty_col < len(row) else None
+            price = row[price_col] if price_col is not None and price_col < len(row) else None
+            amount = row[amount_col] if amount_col is not None and amount_col < len(row) else None
+
+            note = ""
+            if note_col is not None and note_col < len(row):
+                note = row[note_col]
+
+            has_data = False
+
+            if qty is not None:
+                qty_str = str(qty).strip()
+                if qty_str != "" and DataValidator.is_valid_number(qty_str):
+                    has_data = True
+
+            if not has_data and amount is not None:
+                amount_str = str(amount).strip()
+                if amount_str != "" and DataValidator.is_valid_number(amount_str):
+                    has_data = True
+
+            if not has_data and note is not None:
+                try:
+                    note_str = str(note).strip()
+                    if note_str != "":
+                        has_data = True
+                except Exception as e:
+                    logger.warning("[%s车间] 处理备注 %r 时出错: %s，将忽略此备注信息。", self.sheet_name, note, e)
+
+            if has_data:
+                record = self._create_record(
+                    name,
+                    product,
+                    qty if qty is not None else 0,
+                    price if price is not None else 0,
+                    amount if amount is not None else 0,
+                    batch,
+                    str(note) if note is not None else ""
+                )
+                if record:
+                    data_list.append(record)
+                    # print(f"  提取记录: {record}") # 注释掉以避免网页刷屏
+
+    def _process_row(self, row, data_list):
+        if self._is_header_row(row):
+            self._parse_header_row(row)
+        elif self._is_data_row(row):
+            # name = row[1] if len(row) > 1 else "未知"
+            # print(f"  [调试-Raorou] 发现数据行，姓名: '{name}'，开始解析。")
+            self._parse_data_row(row, data_list)
+        else:
+            self._try_extract_metadata_from_row(row)
+
+
+class ZhizuoExtractor(RaorouExtractor):
+    pass
+
+
+class BaozhuangExtractor(WorkshopDataExtractor):
+    # 每个人员数据块的列数：日期、姓名、批次号、产品名称、数量、单价、金额、备注
+    BLOCK_SIZE = 8
+
+    def extract(self, ws, data_list):
+        logger.info("[%s车间] 开始处理工作表", self.sheet_name)
+        ensure_dimensions(ws)
+        max_col = ws.max_column
+        block_offsets = None
+        if not (isinstance(ws, ReadOnlyWorksheet) or getattr(ws, "read_only", False)):
+            # 单元格已在内存中，可以只读姓名列预先找出有数据的列块；只读工作表逐行判断
+            block_offsets = self._find_populated_blocks(ws, max_col)
+        self.extract_rows(ws.iter_rows(values_only=True), data_list, max_col, block_offsets)
+
+    def extract_rows(self, rows, data_list, max_col=None, block_offsets=None):
+        for row in rows:
+            self.rows_scanned += 1
+            if not any(row):
+                continue
+            count = len(data_list)
+            self._process_row(row, data_list, max_col, block_offsets)
+            if len(data_list) != count:
+                self.rows_with_records += 1
+
+    def _find_populated_blocks(self, ws, max_col):
+        """预扫描各块的姓名列，返回出现过有效姓名的块起始列（0 起）；其余块不可能产生记录"""
+        offsets = []
+        for offset in range(0, max_col or 0, self.BLOCK_SIZE):
+            # 与 _parse_data_row 一致：产品名称列超出行宽的块不处理
+            if offset + 3 >= max_col:
+                break
+            for (value,) in ws.iter_rows(min_col=offset + 2, max_col=offset + 2, values_only=True):
+                if value and DataValidator.is_valid_name(value):
+                    offsets.append(offset)
+                    break
+        return offsets
+
+    def _is_header_row(self, row):
+        return False
+
+    def _parse_header_row(self, row):
+        pass
+
+    def _is_data_row(self, row):
+        return False
+
+    def _block_offsets(self, row, max_col, block_offsets=None):
+        """本行需要检查的块：姓名列、产品名称列都在行内，且姓名列不为空"""
+        block_size = self.BLOCK_SIZE
+        block_count = (max_col + block_size - 1) // block_size
+        usable = min(block_count, (len(row) - 4) // block_size + 1) if len(row) > 3 else 0
+        if block_offsets is None:
+            # 取出所有块的姓名列，由 compress 跳过空块
+            names = row[1:usable * block_size:block_size]
+            return [index * block_size for index in compress(range(usable), names)]
+        limit = usable * block_size
+        return [offset for offset in block_offsets if offset < limit and row[offset + 1]]
+
+    def _parse_data_row(self, row, data_list, max_col, block_offsets=None):
+        for offset in self._block_offsets(row, max_col, block_offsets):
+            name_col = offset + 1
+            product_col = offset + 3
+
+            name_value = row[name_col]
+            if not (name_value and DataValidator.is_valid_name(name_value)):
+                continue
+
+            product_value = row[product_col]
+            if not (product_value and isinstance(product_value, str) and
+                    not any(keyword in str(product_value) for keyword in ["产品名称", "品名"])):
+                continue
+
+            name = str(name_value).strip()
+
+            date_col = offset
+            batch_col = offset + 2
+            quantity_col = offset + 4
+            price_col = offset + 5
+            amount_col = offset + 6
+            note_col = offset + 7
+
+            if date_col < len(row) and row[date_col]:
+                parsed_date = DateParser.parse(row[date_col])
+                if parsed_date:
+                    self.current_date = parsed_date
+
+            batch = row[batch_col] if batch_col < len(row) else "0"
+            product = row[product_col] if product_col < len(row) else ""
+            quantity = row[quantity_col] if quantity_col < len(row) else 0
+            price = row[price_col] if price_col < len(row) else 0
+            amount = row[amount_col] if amount_col < len(row) else 0
+
+            note = ""
+            if note_col < len(row):
+                note = row[note_col]
+
+            has_data = False
+            if quantity is not None:
+                try:
+                    quantity_str = str(quantity).strip()
+                    if quantity_str != "" and DataValidator.is_valid_number(quantity_str):
+                        has_data = True
+                except Exception:
+                    pass
+
+            if not has_data and amount is not None:
+                try:
+                    amount_str = str(amount).strip()
+                    if amount_str != "" and DataValidator.is_valid_number(amount_str):
+                        has_data = True
+                except Exception:
+                    pass
+
+            if not has_data and note is not None:
+                try:
+                    note_str = str(note).strip()
+                    if note_str != "":
+                        has_data = True
+                except Exception as e:
+                    logger.warning("[%s车间] 处理备注 %r 时出错: %s，将忽略此备注信息。", self.sheet_name, note, e)
+
+            if product and has_data:
+                record = self._create_record(name, product, quantity, price, amount, batch,
+                                             str(note) if note is not None else "")
+                if record:
+                    data_list.append(record)
+                    # print(f"  提取记录: {record}")
+
+    def _process_row(self, row, data_list, max_col=None, block_offsets=None):
+        if max_col is None:
+            max_col = len(row)
+        self._try_extract_metadata_from_row(row)
+        self._parse_data_row(row, data_list, max_col, block_offsets)
+
+
+# ============================
+# 工作簿读取
+# ============================
+
+# 工作簿读取方式：openpyxl 为默认；lxml 直接解析 xlsx 中的工作表 XML（见 xlsx_reader），总是按行流式读取
+BACKENDS = ["openpyxl", "lxml"]
+
+
+def open_workbook(path, streaming=True, backend="openpyxl"):
+    """打开工作簿；streaming=True 时使用只读模式按行流式解析，内存占用不随行数增长"""
+    if backend == "lxml":
+        try:
+            from xlsx_reader import XmlWorkbook
+            return XmlWorkbook(path)
+        except Exception as e:
+            # 无法用 lxml 读取的文件（如 Strict OOXML、缺少部件）改用 openpyxl
+            logger.warning("lxml 读取工作簿失败，改用 openpyxl: %s", e)
+            if hasattr(path, "seek"):
+                path.seek(0)
+    return load_workbook(path, data_only=True, read_only=streaming)
+
+
+def ensure_dimensions(ws):
+    """
+    只读工作表的行宽取自文件中的 <dimension>。部分导出工具（包括 openpyxl 的只写模式）不写该元素，
+    此时每行只到该行最后一个单元格为止，提取器会把行尾缺失的单元格当作超出行宽处理，结果与普通模式不同。
+    这种工作表先扫描一遍求出最大列号，之后按该宽度补齐各行。
+    """
+    if getattr(ws, "max_column", 0) is not None:
+        return
+    max_col = max((len(row) for row in ws.iter_rows(values_only=True)), default=0)
+    if not max_col:
+        return
+    if isinstance(ws, ReadOnlyWorksheet):
+        # openpyxl 只读工作表没有公开的设置方法，calculate_dimension(force=True) 遇到空行会出错
+        ws._max_column = max_col
+    else:
+        ws.max_column = max_col
+
+
+# ============================
+# 文件过滤与提取器选择
+# ============================
+
+# 文件名中包含任一关键字的文件才会被处理
+FILE_KEYWORDS = ["优萌车间", "生产日报"]
+
+
+def is_report_file(file_name):
+    return any(keyword in file_name for keyword in FILE_KEYWORDS)
+
+
+# 绕肉/制作表的处理引擎：row 逐行处理；grid 整表读入二维数组后按列组批量计算（见 grid_engine）
+ENGINES = ["row", "grid"]
+
+
+def create_extractor(sheet_name, engine="row"):
+    """根据工作表名称选择提取器：绕肉 → RaorouExtractor，制作 → ZhizuoExtractor，其余按包装/挑选版式处理"""
+    if engine == "grid" and ("绕肉" in sheet_name or "制作" in sheet_name):
+        # 依赖 numpy/pandas，只在选择该引擎时导入
+        from grid_engine import GridRaorouExtractor
+        return GridRaorouExtractor(sheet_name)
+    if "绕肉" in sheet_name:
+        return RaorouExtractor(sheet_name)
+    elif "制作" in sheet_name:
+        return ZhizuoExtractor(sheet_name)
+    elif "包装" in sheet_name or "挑选" in sheet_name:
+        return BaozhuangExtractor(sheet_name)
+    else:
+        # 默认提取器
+        return BaozhuangExtractor(sheet_name)
+
+
+# ============================
+# 记录格式
+# ============================
+
+# 提取规则版本：修改任何提取器的解析规则后必须递增，已缓存/入库的结果会随之失效
+EXTRACTOR_VERSION = "1"
+
+# 输出表的列顺序，也是记录元组的字段顺序
+RECORD_FIELDS = ["日期", "姓名", "批次号", "产品名称", "数量", "计量单位", "单价", "金额", "车间名称", "备注"]
+
+
+def record_to_tuple(record):
+    return tuple(record.get(key, "") for key in RECORD_FIELDS)
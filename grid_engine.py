@@ -0,0 +1,225 @@
+import numpy as np
+import pandas as pd
+
+from extractors import HEADER_KEYWORDS, DataValidator, DateParser, RaorouExtractor, logger
+
+# ============================
+# 整表批量处理引擎（绕肉/制作）
+# ============================
+#
+# 先把整张工作表的取值读入一个二维数组，再按列批量完成逐行逻辑中的判断：
+#   1. 用第 2 列（姓名）判断数据行，用关键字判断表头行，其余为元数据行；
+#   2. 元数据行中解析出的日期向下填充，得到每个数据行所用的日期；
+#   3. 每个表头行仍由 RaorouExtractor._parse_header_row 解析出 数量/单价/金额/备注 列组，
+#      表头下方的数据行按列组整列计算 has_data 掩码和数值转换，最后按 (行, 列组) 顺序批量生成记录。
+# 生成的记录与逐行处理完全一致。
+
+# 可以安全地按取值去重的类型；1、1.0、True 会被哈希为同一个键，所以按类型分别去重
+_HASHABLE_TYPES = (str, int, float, bool)
+
+
+def _map_unique(values, func):
+    """对数组中每个不同的取值只调用一次 func，再按位置映射回去，返回同形状的 object 数组"""
+    flat = values.ravel()
+    result = np.empty(len(flat), dtype=object)
+    if not len(flat):
+        return result.reshape(values.shape)
+    types = pd.Series(flat, dtype=object).map(type).to_numpy()
+    for value_type in pd.unique(types):
+        positions = np.flatnonzero(types == value_type)
+        if value_type is type(None):
+            result[positions] = func(None)
+        elif value_type in _HASHABLE_TYPES:
+            codes, uniques = pd.factorize(flat[positions], use_na_sentinel=False)
+            mapped = np.empty(len(uniques), dtype=object)
+            mapped[:] = [func(value) for value in uniques]
+            result[positions] = mapped[codes]
+        else:
+            result[positions] = [func(value) for value in flat[positions]]
+    return result.reshape(values.shape)
+
+
+def _has_keyword(value):
+    return bool(value) and any(keyword in str(value).strip() for keyword in HEADER_KEYWORDS)
+
+
+def _has_number(value):
+    """与逐行逻辑一致：去掉空白后非空且能转为数字"""
+    if value is None:
+        return False
+    text = str(value).strip()
+    return text != "" and DataValidator.is_valid_number(text)
+
+
+def _has_text(value):
+    return value is not None and str(value).strip() != ""
+
+
+def _to_number(value):
+    """与 _parse_data_row/_create_record 一致：空单元格按 0 转换为 0.0，无法转换的取值记为整数 0"""
+    if value is None:
+        return 0.0
+    return float(value) if DataValidator.is_valid_number(value) else 0
+
+
+def load_grid(rows):
+    """将行元组读入二维 object 数组（不足的列补 None），同时返回每行原始长度"""
+    rows = list(rows)
+    lengths = np.fromiter((len(row) for row in rows), dtype=np.int64, count=len(rows))
+    width = int(lengths.max()) if len(rows) else 0
+    grid = np.full((len(rows), width), None, dtype=object)
+    for index, row in enumerate(rows):
+        grid[index, :len(row)] = row
+    return grid, lengths
+
+
+class GridRaorouExtractor(RaorouExtractor):
+    """绕肉/制作表的整表批量处理版本，记录与 RaorouExtractor 逐行处理的结果相同"""
+
+    def extract_rows(self, rows, data_list):
+        grid, lengths = load_grid(rows)
+        row_count, width = grid.shape
+        self.rows_scanned += row_count
+        if not row_count:
+            return
+
+        self._find_initial_metadata(tuple(grid[index, :lengths[index]]) for index in range(min(row_count, self.METADATA_ROWS)))
+        initial_date = self.current_date
+
+        # 1. 行分类
+        if width > 1:
+            is_data = _map_unique(grid[:, 1], DataValidator.is_valid_name).astype(bool)
+        else:
+            is_data = np.zeros(row_count, dtype=bool)
+        is_header = np.zeros(row_count, dtype=bool)
+        candidates = np.flatnonzero(~is_data)
+        if len(candidates):
+            is_header[candidates] = _map_unique(grid[candidates], _has_keyword).astype(bool).any(axis=1)
+        is_meta = ~is_data & ~is_header
+
+        # 2. 元数据行中的日期（每行最后一个可解析的单元格生效），向下填充到后续各行
+        dates = np.full(row_count, None, dtype=object)
+        meta_rows = np.flatnonzero(is_meta)
+        if len(meta_rows) and width:
+            cells = grid[meta_rows]
+            parsed = np.empty(cells.size, dtype=object)
+            parsed[:] = DateParser.parse_many(cells.ravel())
+            parsed = parsed.reshape(cells.shape)
+            found = pd.notna(parsed)
+            has_date = found.any(axis=1)
+            last_col = width - 1 - np.argmax(found[:, ::-1], axis=1)
+            dates[meta_rows[has_date]] = parsed[has_date, last_col[has_date]]
+            # 批次号只影响 current_batch，绕肉记录使用表头中的批次号，这里保持状态一致即可
+            for index in meta_rows:
+                self._update_batch(grid[index, :lengths[index]])
+        # 每行取其上方（含本行）最近一个带日期的元数据行，之前没有时使用开头几行中找到的日期
+        source = np.maximum.accumulate(np.where(pd.notna(dates), np.arange(row_count), -1))
+        row_dates = np.where(source >= 0, dates[source], initial_date)
+        self.current_date = row_dates[-1]
+
+        # 3. 按表头分段，逐个列组批量计算（_parse_header_row 负责表头行计数）
+        header_rows = np.flatnonzero(is_header)
+        data_rows = np.flatnonzero(is_data)
+        pieces = []
+        for band, header in enumerate(header_rows):
+            end = header_rows[band + 1] if band + 1 < len(header_rows) else row_count
+            band_rows = data_rows[(data_rows > header) & (data_rows < end)]
+            self.previous_rows.clear()
+            if header > 0:
+                self.previous_rows.append(tuple(grid[header - 1, :lengths[header - 1]]))
+            self._parse_header_row(tuple(grid[header, :lengths[header]]))
+            if len(band_rows):
+                pieces.extend(self._extract_band(grid, band_rows, row_dates))
+
+        if not pieces:
+            return
+        row_index = np.concatenate([piece[0] for piece in pieces])
+        group_index = np.concatenate([piece[1] for piece in pieces])
+        order = np.lexsort((group_index, row_index))
+        columns = [np.concatenate([piece[2][field] for piece in pieces])[order] for field in range(7)]
+        dates, names, batches, products, quantities, prices, amounts = columns[:7]
+        notes = np.concatenate([piece[3] for piece in pieces])[order]
+
+        records = [
+            {
+                "日期": date,
+                "姓名": name,
+                "批次号": batch,
+                "产品名称": product,
+                "数量": quantity,
+                "计量单位": "",
+                "单价": price,
+                "金额": amount,
+                "车间名称": self.sheet_name,
+                "备注": note,
+            }
+            for date, name, batch, product, quantity, price, amount, note
+            in zip(dates, names, batches, products, quantities, prices, amounts, notes)
+        ]
+        self.rows_with_records += len(np.unique(row_index[order]))
+        data_list.extend(records)
+
+    def _update_batch(self, row):
+        for value in row:
+            if value and isinstance(value, str):
+                cell_value = value.strip()
+                if '批次号：' in cell_value or '批号：' in cell_value:
+                    self.current_batch = cell_value.split('：', 1)[-1].strip() or "0"
+
+    def _extract_band(self, grid, band_rows, row_dates):
+        """对一个表头下方的数据行，按列组批量计算记录；返回 [(行号, 列组号, 字段列, 备注列), ...]"""
+        width = grid.shape[1]
+        empty = np.full(len(band_rows), None, dtype=object)
+
+        def column(col):
+            return grid[band_rows, col] if col is not None and col < width else empty
+
+        # 日期为空时记录无效（validate_record）
+        valid_date = pd.notna(row_dates[band_rows])
+        names = grid[band_rows, 1]
+        pieces = []
+        for group, i in enumerate(range(0, len(self.headers), 4)):
+            if i + 3 >= len(self.headers):
+                continue
+            product = self.headers[i]['product']
+            if not product:
+                # 产品名称为空白时记录无效（validate_record）
+                continue
+            batch = self.headers[i].get('batch', "0")
+            qty = column(self.headers[i]['col'] - 1)
+            price = column(self.headers[i + 1]['col'] - 1)
+            amount = column(self.headers[i + 2]['col'] - 1)
+            note = column(self.headers[i + 3]['col'] - 1)
+
+            has_data = (_map_unique(qty, _has_number).astype(bool)
+                        | _map_unique(amount, _has_number).astype(bool)
+                        | _map_unique(note, _has_text).astype(bool))
+            selected = np.flatnonzero(has_data & valid_date)
+            if not len(selected):
+                continue
+
+            # 数值列保留 float/整数 0 两种取值，与逐行结果的类型一致；计算时按 float64 处理
+            quantities = _map_unique(qty[selected], _to_number)
+            prices = _map_unique(price[selected], _to_number)
+            amounts = _map_unique(amount[selected], _to_number)
+            q = quantities.astype(np.float64)
+            p = prices.astype(np.float64)
+            # 金额为 0 且数量、单价都有值时，金额 = 数量 × 单价
+            fallback = (amounts.astype(np.float64) == 0) & (q != 0) & (p != 0)
+            if fallback.any():
+                amounts[fallback] = (q[fallback] * p[fallback]).tolist()
+
+            count = len(selected)
+            fields = [
+                row_dates[band_rows[selected]],
+                names[selected],
+                np.full(count, batch, dtype=object),
+                np.full(count, product, dtype=object),
+                quantities,
+                prices,
+                amounts,
+            ]
+            notes = _map_unique(note[selected], lambda value: str(value) if value is not None else "")
+            pieces.append((band_rows[selected], np.full(count, group), fields, notes))
+        logger.debug("[%s车间] 表头下方 %d 个数据行批量处理完成", self.sheet_name, len(band_rows))
+        return pieces
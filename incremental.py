@@ -0,0 +1,163 @@
+import sqlite3
+from contextlib import closing
+from datetime import date, datetime
+
+from extractors import EXTRACTOR_VERSION
+
+# ============================
+# 增量入库 (SQLite)
+# ============================
+#
+# 每个处理过的工作簿按文件内容摘要 (fingerprint) 写入本地 SQLite 库，记录再按工作表
+# (车间名称) 分组保存。重新上传同一文件只替换它自己的行，已入库的文件不再解析；
+# 结果表通过按日期范围查询生成，每天的处理量只取决于当天新增的报表。
+
+DEFAULT_DB_PATH = "workshop_records.sqlite3"
+
+# 记录字段在库中的列名，与 RECORD_FIELDS 一一对应
+COLUMNS = ["date", "name", "batch", "product", "quantity", "unit", "price", "amount", "workshop", "note"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    fingerprint TEXT PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    extractor_version TEXT NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    fingerprint TEXT NOT NULL,
+    sheet TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    date TEXT,
+    name TEXT,
+    batch,
+    product TEXT,
+    quantity REAL,
+    unit TEXT,
+    price REAL,
+    amount REAL,
+    workshop TEXT,
+    note TEXT,
+    PRIMARY KEY (fingerprint, seq)
+);
+CREATE INDEX IF NOT EXISTS records_date ON records (date);
+CREATE INDEX IF NOT EXISTS records_sheet ON records (fingerprint, sheet);
+"""
+
+
+def parse_date(value):
+    """
+    日期范围参数转为 date：date/datetime，或 2024-03-01、2024-3-1、2024/3/1 形式的文本；
+    无法识别时抛出 ValueError
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value).strip().replace("/", "-"), "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"无法识别的日期: {value!r}，应为 2024-03-01 形式") from None
+
+
+def _format_date(value):
+    """
+    日期范围参数统一为记录中的 %Y/%m/%d 格式（补齐两位的月、日），None 表示不限。
+    记录中的日期按文本比较，未补齐的端点（如 2024/3/1）会得到错误的范围
+    """
+    if value is None:
+        return None
+    return parse_date(value).strftime("%Y/%m/%d")
+
+
+def _rules_version(rules=""):
+    """入库时的提取规则版本；设置了工作表筛选规则时附加规则摘要，规则变化后文件会重新解析"""
+    return f"{EXTRACTOR_VERSION}:{rules}" if rules else EXTRACTOR_VERSION
+
+
+class RecordDatabase:
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def has_file(self, fingerprint, rules=""):
+        """文件是否已用当前版本的提取规则（及相同的工作表筛选规则）入库"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT extractor_version FROM files WHERE fingerprint = ?",
+                               (fingerprint,)).fetchone()
+        return row is not None and row[0] == _rules_version(rules)
+
+    def replace_file(self, fingerprint, file_name, records, rules=""):
+        """用新的提取结果替换该文件的全部记录（单个事务内完成）"""
+        rows = [(fingerprint, record[8], seq) + tuple(record) for seq, record in enumerate(records)]
+        placeholders = ", ".join("?" * (3 + len(COLUMNS)))
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM records WHERE fingerprint = ?", (fingerprint,))
+            conn.executemany(f"INSERT INTO records (fingerprint, sheet, seq, {', '.join(COLUMNS)}) "
+                             f"VALUES ({placeholders})", rows)
+            conn.execute("INSERT OR REPLACE INTO files (fingerprint, file_name, extractor_version, ingested_at) "
+                         "VALUES (?, ?, ?, ?)",
+                         (fingerprint, file_name, _rules_version(rules), datetime.now().isoformat(timespec="seconds")))
+        return len(rows)
+
+    @staticmethod
+    def _date_filter(start, end):
+        clauses = []
+        params = []
+        if start is not None:
+            clauses.append("r.date >= ?")
+            params.append(_format_date(start))
+        if end is not None:
+            clauses.append("r.date <= ?")
+            params.append(_format_date(end))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count(self, start=None, end=None):
+        where, params = self._date_filter(start, end)
+        with closing(self._connect()) as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM records r{where}", params).fetchone()[0]
+
+    def query(self, start=None, end=None):
+        """按日期范围（含两端）逐行返回记录元组，顺序为 (文件名, 文件内顺序)，与并行处理的合并顺序一致"""
+        where, params = self._date_filter(start, end)
+        sql = (f"SELECT {', '.join('r.' + column for column in COLUMNS)} FROM records r "
+               f"JOIN files f ON f.fingerprint = r.fingerprint{where} ORDER BY f.file_name, f.fingerprint, r.seq")
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                yield from rows
+
+    def query_files(self, start=None, end=None):
+        """与 query 的顺序相同，逐个文件返回 (文件名, 入库时间, 该文件在日期范围内的记录元组列表)"""
+        where, params = self._date_filter(start, end)
+        sql = (f"SELECT f.fingerprint, f.file_name, f.ingested_at, {', '.join('r.' + column for column in COLUMNS)} "
+               f"FROM records r JOIN files f ON f.fingerprint = r.fingerprint{where} "
+               f"ORDER BY f.file_name, f.fingerprint, r.seq")
+        current = None
+        file_name = None
+        ingested_at = None
+        records = []
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                for row in rows:
+                    if row[0] != current:
+                        if current is not None:
+                            yield file_name, ingested_at, records
+                        current, file_name, ingested_at, records = row[0], row[1], row[2], []
+                    records.append(row[3:])
+        if current is not None:
+            yield file_name, ingested_at, records
@@ -0,0 +1,137 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+# ============================
+# 上传文件读取
+# ============================
+#
+# 上传的文件默认直接在内存中解析：openpyxl 通过只读的 BufferReader 访问上传缓冲区，
+# 不复制整个文件、也不落盘。只有超过 spill_threshold 的大文件才写入临时文件，
+# 并保证在任何情况下（包括解析出错）都会被删除。
+#
+# 除 bytes/memoryview/mmap 外，文件内容也可以是按需读取的来源：带 open() 和 size 的对象
+# （如压缩包成员 archive.ArchiveMember），用到时才解压，内容不在内存中保留。
+
+# 超过该大小（字节）的上传文件落盘后再解析，None 表示始终在内存中解析
+SPILL_THRESHOLD_BYTES = 256 * 1024 * 1024
+
+# 按需读取的来源计算摘要时每次读取的字节数
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def is_deferred(data):
+    """是否为按需读取的来源（带 open() 和 size）"""
+    return hasattr(data, "open") and hasattr(data, "size")
+
+
+def content_size(data):
+    """文件内容的字节数；按需读取的来源为解压后的大小"""
+    return data.size if is_deferred(data) else memoryview(data).nbytes
+
+
+def read_content(data):
+    """文件内容：按需读取的来源此时才读入内存，其余原样返回"""
+    if is_deferred(data):
+        with data.open() as f:
+            return f.read()
+    return data
+
+
+class BufferReader(io.RawIOBase):
+    """基于 memoryview 的只读、可 seek 的文件对象，读取时不复制整个缓冲区"""
+
+    def __init__(self, data):
+        super().__init__()
+        self._view = memoryview(data).cast("B")
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._pos + offset
+        elif whence == io.SEEK_END:
+            position = len(self._view) + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        if position < 0:
+            raise ValueError(f"negative seek position {position}")
+        self._pos = position
+        return position
+
+    def read(self, size=-1):
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        end = len(self._view) if size is None or size < 0 else min(self._pos + size, len(self._view))
+        if end <= self._pos:
+            return b""
+        chunk = self._view[self._pos:end].tobytes()
+        self._pos = end
+        return chunk
+
+    def readall(self):
+        return self.read()
+
+    def readinto(self, buffer):
+        chunk = self.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+
+@contextmanager
+def open_upload(data, suffix=".xlsx", spill_threshold=SPILL_THRESHOLD_BYTES):
+    """
+    返回可交给 load_workbook 的数据源：小文件为内存中的 BufferReader，
+    超过 spill_threshold 的文件为临时文件路径。退出时释放缓冲区视图或删除临时文件。
+    按需读取的来源超过 spill_threshold 时直接分块写入临时文件，不整体读入内存。
+    """
+    if spill_threshold is not None and content_size(data) > spill_threshold:
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                if is_deferred(data):
+                    with data.open() as src:
+                        shutil.copyfileobj(src, tmp, HASH_CHUNK_BYTES)
+                else:
+                    tmp.write(data)
+            yield path
+        finally:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+    else:
+        reader = BufferReader(read_content(data))
+        try:
+            yield reader
+        finally:
+            reader.close()
+
+
+def file_fingerprint(data):
+    """文件内容的 SHA-256 摘要，用作缓存和增量入库的文件标识；按需读取的来源分块计算，不整体读入内存"""
+    if is_deferred(data):
+        digest = hashlib.sha256()
+        with data.open() as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    return hashlib.sha256(memoryview(data)).hexdigest()
@@ -0,0 +1,83 @@
+import json
+import logging
+import time
+
+# ============================
+# 运行统计与日志
+# ============================
+#
+# 每个工作表记录一条统计：解析耗时、扫描行数、表头行数、记录数、跳过行数；按筛选规则跳过的工作表记录跳过原因。
+# 统计以普通字典保存，可以跨进程传递，也可以直接导出为 JSON。
+
+# 统计字段 → 页面表格中的列名
+STAT_COLUMNS = {
+    "file": "文件",
+    "sheet": "工作表",
+    "extractor": "提取器",
+    "seconds": "耗时(秒)",
+    "rows_scanned": "扫描行数",
+    "header_rows": "表头行数",
+    "records": "记录数",
+    "rows_skipped": "跳过行数",
+    "source": "来源",
+    "skipped": "跳过原因",
+    "error": "错误",
+}
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+logger = logging.getLogger(__name__)
+
+
+def configure_logging(level="WARNING"):
+    """配置提取器日志级别；默认 WARNING，调试时用 DEBUG 查看每个表头行"""
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+    logging.getLogger("extractors").setLevel(level)
+
+
+def run_extractor(extractor, ws, data_list):
+    """运行提取器并返回该工作表的统计字典；提取出错时不抛出异常，错误信息记录在 error 字段中"""
+    start = time.perf_counter()
+    count = len(data_list)
+    error = None
+    try:
+        extractor.extract(ws, data_list)
+    except Exception as e:
+        error = str(e)
+        logger.warning("[%s车间] 处理工作表时出错: %s", extractor.sheet_name, e)
+    return {
+        "sheet": extractor.sheet_name,
+        "extractor": type(extractor).__name__,
+        "seconds": round(time.perf_counter() - start, 4),
+        "rows_scanned": extractor.rows_scanned,
+        "header_rows": extractor.header_rows,
+        "records": len(data_list) - count,
+        "rows_skipped": extractor.rows_skipped,
+        "skipped": None,
+        "error": error,
+    }
+
+
+def skipped_stats(sheet_name, reason, seconds=0.0, rows_scanned=0):
+    """未解析的工作表的统计字典；rows_scanned 为预检读取的行数"""
+    return {
+        "sheet": sheet_name,
+        "extractor": None,
+        "seconds": round(seconds, 4),
+        "rows_scanned": rows_scanned,
+        "header_rows": 0,
+        "records": 0,
+        "rows_skipped": rows_scanned,
+        "skipped": reason,
+        "error": None,
+    }
+
+
+def stats_to_json(stats, **extra):
+    """将统计列表（以及额外的运行信息）导出为 JSON 字符串"""
+    return json.dumps(dict(extra, sheets=list(stats)), ensure_ascii=False, indent=2)
+
+
+def stats_table(stats):
+    """转换为页面表格使用的列名"""
+    return [{label: entry.get(key) for key, label in STAT_COLUMNS.items()} for entry in stats]
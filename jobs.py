@@ -0,0 +1,285 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+
+from background import BackgroundRun
+from ingest import content_size
+from parallel import default_workers
+from record_store import RECORDS_MEMORY_LIMIT_BYTES, SpillingRecordStore
+
+logger = logging.getLogger(__name__)
+
+# ============================
+# 作业队列
+# ============================
+#
+# 月末多人同时在一个部署上处理时，每次点击都直接开始解析，几个大批量同时运行会争抢 CPU 和内存，
+# 全部变慢甚至拖垮进程。处理请求改为提交到服务进程内共享的作业队列：
+#   - 准入：文件数、文件总大小超过上限，或排队的作业数/文件大小已满时直接拒绝，提示稍后再试；
+#   - 同时运行的作业数有上限，其余按提交顺序排队，可以查看排队位置，也可以在开始前取消；
+#   - 每个作业的解析进程数和记录占用的内存有上限（超出部分转存到临时文件，见 record_store）；
+#   - 结束的作业在保留期限内可以按作业编号重新打开并下载结果，过期后删除临时文件。
+#     作业结束时内存中的记录写入临时文件，页面生成的结果文件、汇总表也写入作业的临时目录，
+#     保留的作业只占用磁盘；保留的作业数和占用的磁盘空间都有上限，超出时删除最早结束的作业。
+# 队列只使用线程和本地临时文件，不依赖外部服务，可以直接在本地构造和测试。
+
+# 同时运行的作业数
+MAX_RUNNING_JOBS = 2
+# 排队（未开始）的作业数上限
+MAX_QUEUED_JOBS = 20
+# 排队的作业的文件总大小上限（字节）；排队期间上传的文件保留在内存中
+MAX_QUEUED_BYTES = 2 * 1024 * 1024 * 1024
+# 单个作业的文件数上限
+MAX_JOB_FILES = 1000
+# 单个作业的文件总大小上限（字节），压缩包成员按解压后的大小计算
+MAX_JOB_BYTES = 1024 * 1024 * 1024
+# 单个作业的记录在内存中的上限（字节），超出部分转存到临时文件
+JOB_MEMORY_LIMIT_BYTES = RECORDS_MEMORY_LIMIT_BYTES
+# 结束的作业保留的秒数
+JOB_RETENTION_SECONDS = 2 * 60 * 60
+# 保留期限内最多保留的已结束作业数，超出时删除最早结束的
+MAX_RETAINED_JOBS = 50
+# 已结束的作业的临时目录（记录、结果文件等）总大小上限（字节），超出时删除最早结束的
+MAX_RETAINED_BYTES = 4 * 1024 * 1024 * 1024
+
+# 作业状态 → 说明
+JOB_STATES = {
+    "queued": "排队中",
+    "running": "处理中",
+    "done": "已完成",
+    "cancelled": "已取消",
+    "failed": "处理失败",
+}
+
+
+class JobRejected(Exception):
+    """作业未被接受（超出文件数、大小上限或队列已满），消息可以直接显示给用户"""
+
+
+class Job:
+    """
+    一次处理请求。
+
+    run: 作业的 BackgroundRun，排队期间尚未启动
+    owner: 提交者标识（如页面会话编号），用于列出同一用户的作业
+    settings: 生成结果所需的设置（输出格式等），由调用方保存和使用；生成的结果文件写入 directory，
+        不在 settings 中保留
+    directory: 作业的临时目录，作业被删除时随之删除
+    """
+
+    def __init__(self, run, owner=None, settings=None, input_bytes=0, directory=None):
+        self.id = uuid.uuid4().hex
+        self.run = run
+        self.directory = directory
+        self.owner = owner
+        self.settings = settings if settings is not None else {}
+        self.input_bytes = input_bytes
+        self.submitted_at = time.time()
+        # 结束（或排队时被取消）的时间，保留期限从此时开始计算
+        self.finished_at = None
+        self.started = False
+        # 开始前被取消，不会再运行
+        self.dropped = False
+
+    @property
+    def state(self):
+        if self.dropped:
+            return "cancelled"
+        if not self.started:
+            return "queued"
+        if self.run.running:
+            return "running"
+        if self.run.error is not None:
+            return "failed"
+        return "cancelled" if self.run.cancelled else "done"
+
+    @property
+    def active(self):
+        """排队中或处理中"""
+        return self.state in ("queued", "running")
+
+    def path(self, name):
+        """作业临时目录中的文件路径"""
+        return os.path.join(self.directory, name)
+
+    def retained_bytes(self):
+        """作业临时目录中文件的总大小"""
+        if self.directory is None or not os.path.isdir(self.directory):
+            return 0
+        total = 0
+        for entry in os.scandir(self.directory):
+            try:
+                total += entry.stat().st_size
+            except FileNotFoundError:
+                continue
+        return total
+
+    def release(self):
+        """作业结束后释放内存：记录写入临时文件，重复记录索引只保留重复的键"""
+        if self.run.store is not None:
+            self.run.store.spill()
+        if self.run.duplicates is not None:
+            self.run.duplicates.finish()
+
+    def remove(self):
+        """删除作业的临时文件"""
+        if self.run.store is not None:
+            self.run.store.close()
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class JobQueue:
+    """
+    服务进程内共享的作业队列，由 max_running 个线程按提交顺序运行作业。
+
+    max_workers: 每个作业的解析进程数上限，默认将 CPU 平均分给同时运行的作业
+    memory_limit: 每个作业的记录在内存中的上限（字节），增量模式的记录写入数据库，不受此限制
+    directory: 作业临时目录的上级目录，None 表示系统临时目录
+    """
+
+    def __init__(self, max_running=MAX_RUNNING_JOBS, max_queued=MAX_QUEUED_JOBS, max_queued_bytes=MAX_QUEUED_BYTES,
+                 max_files=MAX_JOB_FILES, max_bytes=MAX_JOB_BYTES, memory_limit=JOB_MEMORY_LIMIT_BYTES,
+                 max_workers=None, retention_seconds=JOB_RETENTION_SECONDS, max_retained=MAX_RETAINED_JOBS,
+                 max_retained_bytes=MAX_RETAINED_BYTES, directory=None):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.max_queued_bytes = max_queued_bytes
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.memory_limit = memory_limit
+        self.max_workers = max_workers or max(1, default_workers() // max_running)
+        self.retention_seconds = retention_seconds
+        self.max_retained = max_retained
+        self.max_retained_bytes = max_retained_bytes
+        self.directory = directory
+        self._jobs = {}  # 作业编号 -> Job，按提交顺序
+        self._queued = deque()
+        self._threads = []
+        self._condition = threading.Condition()
+
+    def submit(self, files, owner=None, settings=None, memory_limit=None, **options):
+        """
+        提交作业，返回 Job；超出上限时抛出 JobRejected。
+
+        files: [(文件名, 文件内容), ...]，见 pipeline.process_files
+        memory_limit: 本作业的记录内存上限（字节），不超过队列的 memory_limit；None 表示使用队列的上限
+        options: 传给 BackgroundRun 的其余参数（by_name、duplicates、workers、cache、database 等），
+            workers 不超过 max_workers
+        """
+        self.purge()
+        if len(files) > self.max_files:
+            raise JobRejected(f"一次最多处理 {self.max_files} 个文件，本次为 {len(files)} 个，请分批提交。")
+        input_bytes = sum(content_size(data) for _, data in files)
+        if input_bytes > self.max_bytes:
+            raise JobRejected(f"文件总大小 {input_bytes / 2 ** 20:.0f} MB 超过单个作业的上限 "
+                              f"{self.max_bytes / 2 ** 20:.0f} MB，请分批提交。")
+        memory_limit = min(memory_limit or self.memory_limit, self.memory_limit)
+        options["workers"] = min(options.get("workers", 1), self.max_workers)
+        with self._condition:
+            if len(self._queued) >= self.max_queued:
+                raise JobRejected(f"已有 {len(self._queued)} 个作业在排队，请稍后再试。")
+            queued_bytes = sum(job.input_bytes for job in self._queued)
+            if queued_bytes + input_bytes > self.max_queued_bytes:
+                raise JobRejected("排队的作业文件过多，请稍后再试。")
+            directory = tempfile.mkdtemp(prefix="job_", dir=self.directory)
+            # 每个文件完成后记录即转存，内存不随文件数增长；增量模式下记录已在数据库中
+            store = SpillingRecordStore(memory_limit, directory) if options.get("database") is None else None
+            run = BackgroundRun(files, store=store, release_records=True, **options)
+            job = Job(run, owner, settings, input_bytes, directory)
+            self._jobs[job.id] = job
+            self._queued.append(job)
+            if len(self._threads) < self.max_running:
+                thread = threading.Thread(target=self._work, name=f"job-worker-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._condition.notify()
+        return job
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._queued:
+                    self._condition.wait()
+                job = self._queued.popleft()
+                job.started = True
+                job.run.start()
+            job.run.wait()
+            job.release()
+            job.finished_at = time.time()
+            logger.info("作业 %s 结束: %s，耗时 %.1f 秒", job.id, job.state, job.run.elapsed)
+            self.purge()
+
+    def position(self, job):
+        """排队位置（1 表示下一个开始），不在排队中时为 None"""
+        with self._condition:
+            try:
+                return self._queued.index(job) + 1
+            except ValueError:
+                return None
+
+    def cancel(self, job):
+        """排队中的作业移出队列，不再运行；运行中的作业不再开始新的文件，已完成的文件照常保留"""
+        with self._condition:
+            if not job.started:
+                if job in self._queued:
+                    self._queued.remove(job)
+                job.dropped = True
+                job.finished_at = time.time()
+                # 释放排队期间保留的上传文件
+                job.run.files = None
+                return
+        job.run.cancel()
+
+    def get(self, job_id):
+        """按编号查找作业，不存在或已过保留期限时返回 None"""
+        self.purge()
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def jobs(self, owner=None):
+        """全部作业（或某个提交者的作业），按提交顺序"""
+        with self._condition:
+            return [job for job in self._jobs.values() if owner is None or job.owner == owner]
+
+    def stats(self):
+        """{状态: 作业数}"""
+        counts = dict.fromkeys(JOB_STATES, 0)
+        for job in self.jobs():
+            counts[job.state] += 1
+        return counts
+
+    def retained_bytes(self):
+        """已结束的作业的临时文件总大小"""
+        return sum(job.retained_bytes() for job in self.jobs() if job.finished_at is not None)
+
+    def purge(self, now=None):
+        """
+        删除超过保留期限、或超出保留数量/保留空间的已结束作业及其临时文件，返回删除的作业数。
+        提交作业时先调用，新作业开始前已结束作业占用的空间不超过 max_retained_bytes
+        """
+        now = time.time() if now is None else now
+        with self._condition:
+            finished = sorted((job for job in self._jobs.values() if job.finished_at is not None),
+                              key=lambda job: job.finished_at)
+            excess = len(finished) - self.max_retained
+            expired = [job for index, job in enumerate(finished)
+                       if index < excess or now - job.finished_at > self.retention_seconds]
+            # 保留空间从最近结束的作业开始计算，超出部分删除
+            retained = 0
+            for job in reversed(finished):
+                if job in expired:
+                    continue
+                retained += job.retained_bytes()
+                if retained > self.max_retained_bytes:
+                    expired.append(job)
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            job.remove()
+        return len(expired)
@@ -0,0 +1,258 @@
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from extractors import create_extractor, open_workbook, record_to_tuple
+from ingest import SPILL_THRESHOLD_BYTES, open_upload, read_content
+from instrumentation import run_extractor, skipped_stats
+
+logger = logging.getLogger(__name__)
+
+# ============================
+# 多进程并行提取
+# ============================
+#
+# 任务以 (文件名, 文件内容) 的形式分发给进程池，工作进程只返回普通的记录元组，
+# 主进程按 (文件名, 上传顺序, 工作表顺序) 合并，保证每次运行输出的行顺序一致。
+
+
+def default_workers():
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def _extract_worksheet(wb, sheet_name, engine="row", sheet_filter=None):
+    """按筛选规则检查并提取已打开工作簿中的一个工作表，返回 (记录元组列表, 统计字典)"""
+    if sheet_filter is not None:
+        start = time.perf_counter()
+        reason = sheet_filter.name_skip_reason(sheet_name)
+        probed = 0
+        if reason is None:
+            try:
+                reason, probed = sheet_filter.probe_skip_reason(wb[sheet_name])
+            except Exception:
+                # 预检出错时照常解析，由提取器报告错误
+                reason = None
+        if reason is not None:
+            return [], skipped_stats(sheet_name, reason, time.perf_counter() - start, probed)
+    records = []
+    stats = run_extractor(create_extractor(sheet_name, engine), wb[sheet_name], records)
+    if stats["error"] is not None:
+        return [], stats
+    return [record_to_tuple(record) for record in records], stats
+
+
+def extract_sheet(source, sheet_name, streaming=True, engine="row", sheet_filter=None, backend="openpyxl"):
+    """提取单个工作表，返回 (记录元组列表, 统计字典)"""
+    wb = open_workbook(source, streaming=streaming, backend=backend)
+    try:
+        return _extract_worksheet(wb, sheet_name, engine, sheet_filter)
+    finally:
+        wb.close()
+
+
+def list_sheets(data, streaming=True, spill_threshold=SPILL_THRESHOLD_BYTES, backend="openpyxl"):
+    with open_upload(data, spill_threshold=spill_threshold) as source:
+        wb = open_workbook(source, streaming=streaming, backend=backend)
+        try:
+            return list(wb.sheetnames)
+        finally:
+            wb.close()
+
+
+def _extract_file_task(data, streaming, spill_threshold, engine="row", sheet_filter=None, backend="openpyxl"):
+    """工作进程：按顺序提取一个文件的全部工作表，单个工作表出错不影响其他工作表"""
+    results = []
+    with open_upload(data, spill_threshold=spill_threshold) as source:
+        wb = open_workbook(source, streaming=streaming, backend=backend)
+        try:
+            for sheet_index, sheet_name in enumerate(wb.sheetnames):
+                records, stats = _extract_worksheet(wb, sheet_name, engine, sheet_filter)
+                results.append((sheet_index, sheet_name, records, stats))
+        finally:
+            wb.close()
+    return results
+
+
+def _extract_sheet_task(data, sheet_index, sheet_name, streaming, spill_threshold, engine="row", sheet_filter=None,
+                        backend="openpyxl"):
+    """工作进程：提取一个文件中的单个工作表"""
+    try:
+        with open_upload(data, spill_threshold=spill_threshold) as source:
+            records, stats = extract_sheet(source, sheet_name, streaming, engine, sheet_filter, backend)
+    except Exception as e:
+        records, stats = [], {"sheet": sheet_name, "error": str(e)}
+    return [(sheet_index, sheet_name, records, stats)]
+
+
+def _collect(sheet_results):
+    """
+    将 [(工作表序号, 工作表名, 记录, 统计), ...] 按工作表顺序合并为
+    (记录元组列表, [(工作表名, 错误信息), ...], [统计字典, ...])
+    """
+    sheet_results = sorted(sheet_results, key=lambda item: item[0])
+    records = [record for _, _, sheet_records, _ in sheet_results for record in sheet_records]
+    errors = [(sheet_name, stats["error"]) for _, sheet_name, _, stats in sheet_results
+              if stats.get("error") is not None]
+    return records, errors, [stats for _, _, _, stats in sheet_results]
+
+
+def extract_file(data, streaming=True, spill_threshold=SPILL_THRESHOLD_BYTES, engine="row", sheet_filter=None,
+                 backend="openpyxl"):
+    """
+    在当前进程中提取一个文件的全部工作表。
+
+    返回 (记录元组列表, [(工作表名, 错误信息), ...], [每个工作表的统计字典, ...])；
+    文件本身无法打开时抛出异常。
+    """
+    return _collect(_extract_file_task(data, streaming, spill_threshold, engine, sheet_filter, backend))
+
+
+# 并行提取时检查取消标志的间隔（秒）
+CANCEL_POLL_SECONDS = 0.2
+
+# 每个工作进程最多排队的任务数；任务按需提交，同一时刻只有这些任务的文件内容被复制给进程池
+MAX_PENDING_PER_WORKER = 2
+
+# 工作进程异常退出时，当时正在该进程池中运行或排队的任务的错误信息
+BROKEN_WORKER_MESSAGE = "解析进程异常退出（可能是内存不足被系统终止），该文件未能处理，请单独重试"
+
+
+def _cancelled(cancel):
+    return cancel is not None and cancel.is_set()
+
+
+def iter_extract_parallel(files, workers=None, per_sheet=False, streaming=True,
+                          spill_threshold=SPILL_THRESHOLD_BYTES, engine="row", sheet_filter=None,
+                          backend="openpyxl", cancel=None):
+    """
+    并行提取多个文件，每个文件的全部任务完成后立即产出 (文件序号, (记录元组列表, 错误列表, 统计列表))，
+    产出顺序为完成顺序。
+
+    files: [(文件名, 文件内容), ...]，内容可以是 bytes、memoryview、mmap 或按需读取的来源（如压缩包成员），
+        提交任务时才读取或复制为 bytes
+    per_sheet: True 时以工作表为单位分发任务（适合文件少但工作表多的情况）
+    spill_threshold: 超过该大小的文件在工作进程中落盘解析，见 ingest.open_upload
+    engine: 绕肉/制作表的处理引擎，见 extractors.ENGINES
+    sheet_filter: 工作表筛选规则 (sheet_selection.SheetFilter)，未通过的工作表不解析
+    backend: 工作簿读取方式，见 extractors.BACKENDS
+    cancel: 带 is_set() 的取消标志（如 threading.Event）；置位后不再产出，尚未开始的任务被取消，
+        正在运行的任务在工作进程中执行完毕后丢弃。生成器被提前关闭时同样处理。
+
+    错误列表为 [(工作表名, 错误信息), ...]，文件本身无法打开时工作表名为 None。
+    工作进程异常退出时，已提交给该进程池的任务按出错处理，其余任务在新的进程池中继续。
+    """
+    workers = workers or default_workers()
+    sheet_results = [[] for _ in files]
+    file_errors = [[] for _ in files]
+    remaining = [0] * len(files)
+
+    def file_result(file_index):
+        records, errors, stats = _collect(sheet_results[file_index])
+        sheet_results[file_index] = []
+        return records, file_errors[file_index] + errors, stats
+
+    def file_tasks(file_index):
+        """一个文件的任务列表 [(函数, 参数), ...]"""
+        file_name, data = files[file_index]
+        try:
+            # 进程间只能传递 bytes
+            content = bytes(read_content(data))
+        except Exception as e:
+            file_errors[file_index].append((None, str(e)))
+            return []
+        if not per_sheet:
+            return [(_extract_file_task, (content, streaming, spill_threshold, engine, sheet_filter, backend))]
+        try:
+            sheet_names = list_sheets(content, streaming, spill_threshold, backend)
+        except Exception as e:
+            file_errors[file_index].append((None, str(e)))
+            return []
+        tasks = []
+        for sheet_index, sheet_name in enumerate(sheet_names):
+            # 按名称跳过的工作表不分发任务，预检在工作进程中进行
+            reason = sheet_filter.name_skip_reason(sheet_name) if sheet_filter is not None else None
+            if reason is not None:
+                sheet_results[file_index].append((sheet_index, sheet_name, [], skipped_stats(sheet_name, reason)))
+                continue
+            tasks.append((_extract_sheet_task, (content, sheet_index, sheet_name, streaming, spill_threshold,
+                                                engine, sheet_filter, backend)))
+        return tasks
+
+    # spawn 方式启动工作进程，避免在 Streamlit 的多线程服务进程中 fork
+    context = multiprocessing.get_context("spawn")
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    max_pending = workers * MAX_PENDING_PER_WORKER
+    completed = False
+    try:
+        futures = {}
+        queued = deque()
+        next_file = 0
+        while True:
+            if _cancelled(cancel):
+                return
+            # 补充任务，直到排队的任务数达到上限
+            while len(futures) < max_pending and (queued or next_file < len(files)):
+                if queued:
+                    file_index, (func, args) = queued.popleft()
+                    try:
+                        future = pool.submit(func, *args)
+                    except BrokenProcessPool:
+                        # 有工作进程异常退出（如内存不足被系统终止）后进程池不再接受任务：
+                        # 当时正在运行的任务已按出错处理，之后的任务换用新的进程池
+                        logger.warning("工作进程异常退出，重新创建进程池")
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+                        future = pool.submit(func, *args)
+                    futures[future] = file_index
+                    continue
+                file_index = next_file
+                next_file += 1
+                tasks = file_tasks(file_index)
+                remaining[file_index] = len(tasks)
+                if not tasks:
+                    # 无法打开或全部工作表按名称跳过的文件没有任务，直接产出
+                    yield file_index, file_result(file_index)
+                queued.extend((file_index, task) for task in tasks)
+            if not futures:
+                break
+            done, _ = wait(futures, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_index = futures.pop(future)
+                try:
+                    sheet_results[file_index].extend(future.result())
+                except BrokenProcessPool:
+                    file_errors[file_index].append((None, BROKEN_WORKER_MESSAGE))
+                except Exception as e:
+                    file_errors[file_index].append((None, str(e)))
+                remaining[file_index] -= 1
+                if not remaining[file_index]:
+                    yield file_index, file_result(file_index)
+        completed = True
+    finally:
+        # 取消时不等待正在运行的任务
+        pool.shutdown(wait=completed, cancel_futures=True)
+
+
+def extract_each_file_parallel(files, workers=None, per_sheet=False, streaming=True,
+                               spill_threshold=SPILL_THRESHOLD_BYTES, engine="row", sheet_filter=None,
+                               backend="openpyxl"):
+    """
+    并行提取多个文件，返回与 files 一一对应的 [(记录元组列表, 错误列表, 统计列表), ...]。
+
+    参数和错误列表的格式见 iter_extract_parallel。
+    """
+    results = [None] * len(files)
+    for file_index, result in iter_extract_parallel(files, workers=workers, per_sheet=per_sheet,
+                                                    streaming=streaming, spill_threshold=spill_threshold,
+                                                    engine=engine, sheet_filter=sheet_filter, backend=backend):
+        results[file_index] = result
+    return results
+
+
+def merge_order(file_names):
+    """并行结果的合并顺序：按 (文件名, 上传顺序)"""
+    return sorted(range(len(file_names)), key=lambda index: (file_names[index], index))
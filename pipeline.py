@@ -0,0 +1,181 @@
+import time
+
+from ingest import SPILL_THRESHOLD_BYTES, file_fingerprint
+from parallel import extract_file, iter_extract_parallel, merge_order
+
+# ============================
+# 处理流程
+# ============================
+#
+# Streamlit 页面和命令行共用的处理流程：查数据库/结果缓存 → 解析新文件（逐个或并行）
+# → 写回缓存/数据库。调用方负责文件名过滤和结果输出。
+
+
+class FileResult:
+    """单个文件的处理结果"""
+
+    def __init__(self, name, fingerprint, records=None, errors=None, source="parsed"):
+        self.name = name
+        self.fingerprint = fingerprint
+        self.records = records if records is not None else []
+        # [(工作表名, 错误信息), ...]，工作表名为 None 表示文件本身无法处理
+        self.errors = errors if errors is not None else []
+        # parsed: 本次解析；cache: 来自结果缓存；database: 已在增量数据库中，本次未加载记录；
+        # pending: 等待解析；cancelled: 运行被取消，未解析
+        self.source = source
+        # 每个工作表的统计字典，见 instrumentation.run_extractor
+        self.sheet_stats = []
+        self.seconds = 0.0
+        # release_records() 之后记录已转存到别处，只保留条数
+        self._released_count = None
+
+    @property
+    def record_count(self):
+        return len(self.records) if self._released_count is None else self._released_count
+
+    def release_records(self):
+        """记录已转存（如写入 SpillingRecordStore）后释放内存，record_count 保持不变"""
+        self._released_count = self.record_count
+        self.records = []
+
+    def stats(self):
+        """带文件名和来源的工作表统计；未解析的文件返回一条文件级统计"""
+        if not self.sheet_stats:
+            error = next((message for sheet_name, message in self.errors if sheet_name is None), None)
+            return [{"file": self.name, "sheet": None, "seconds": round(self.seconds, 4),
+                     "records": self.record_count, "source": self.source, "error": error}]
+        return [dict(stats, file=self.name, source=self.source) for stats in self.sheet_stats]
+
+    def skipped_sheets(self):
+        """按筛选规则跳过的工作表 [(工作表名, 跳过原因), ...]"""
+        return [(stats["sheet"], stats["skipped"]) for stats in self.sheet_stats if stats.get("skipped")]
+
+    @property
+    def failed(self):
+        return any(sheet_name is None for sheet_name, _ in self.errors)
+
+    @property
+    def finished(self):
+        """是否已有结果（命中数据库/缓存或解析完成）"""
+        return self.source not in ("pending", "cancelled")
+
+
+def process_files(files, workers=1, per_sheet=False, streaming=True, spill_threshold=SPILL_THRESHOLD_BYTES,
+                  cache=None, database=None, on_progress=None, engine="row", sheet_filter=None, backend="openpyxl",
+                  on_result=None, cancel=None):
+    """
+    处理已通过文件名过滤的文件，返回与 files 顺序一致的 FileResult 列表。
+
+    files: [(文件名, 文件内容), ...]，内容可以是 bytes、memoryview，或按需读取的来源（如压缩包成员，
+        见 ingest.is_deferred），后者在计算摘要和解析时才读取
+    cache: ResultCache，命中的文件不再解析
+    database: RecordDatabase，已入库的文件不再解析，新解析的文件写入数据库
+    on_progress: 回调 on_progress(已完成数, 待解析总数, 文件名)；文件名为即将解析的文件，
+        并行处理或全部完成时为 None
+    engine: 绕肉/制作表的处理引擎，两种引擎的结果相同，因此不影响缓存和数据库中的结果
+    sheet_filter: 工作表筛选规则 (sheet_selection.SheetFilter)，规则不同时不复用缓存和数据库中的结果
+    backend: 工作簿读取方式 (openpyxl/lxml)，读取结果相同，不影响缓存和数据库中的结果
+    on_result: 回调 on_result(序号, FileResult)，每个文件有结果时立即调用（并行处理时按完成顺序），
+        此时该文件已写入缓存/数据库
+    cancel: 带 is_set() 的取消标志（如 threading.Event）；置位后不再开始解析新的文件，
+        未解析的文件 source 为 "cancelled"，已完成的文件照常返回
+    """
+    rules = sheet_filter.signature() if sheet_filter is not None else ""
+
+    def finish(index):
+        result = results[index]
+        if result.source != "database" and not result.failed:
+            # 只缓存文件能正常打开的结果；工作表级错误由文件内容决定，随结果一起缓存
+            if cache is not None and result.source == "parsed":
+                cache.put(cache.key_for(result.fingerprint, rules), result.records, result.errors)
+            # 增量模式：只替换该文件自己的记录
+            if database is not None:
+                database.replace_file(result.fingerprint, result.name, result.records, rules)
+        if on_result is not None:
+            on_result(index, result)
+
+    results = []
+    for name, data in files:
+        try:
+            fingerprint = file_fingerprint(data)
+        except Exception as e:
+            # 无法读取的来源（如加密或损坏的压缩包成员）
+            results.append(FileResult(name, None, errors=[(None, str(e))]))
+            continue
+        if database is not None and database.has_file(fingerprint, rules):
+            results.append(FileResult(name, fingerprint, source="database"))
+            continue
+        cached = cache.get(cache.key_for(fingerprint, rules)) if cache is not None else None
+        if cached is not None:
+            results.append(FileResult(name, fingerprint, list(cached[0]), list(cached[1]), source="cache"))
+        else:
+            results.append(FileResult(name, fingerprint, source="pending"))
+    for index, result in enumerate(results):
+        if result.finished:
+            finish(index)
+
+    pending = [index for index, result in enumerate(results) if result.source == "pending"]
+    done = 0
+    if workers > 1 and len(pending) > 1:
+        tasks = [files[index] for index in pending]
+        if on_progress is not None:
+            on_progress(0, len(pending), None)
+        for task_index, (records, errors, stats) in iter_extract_parallel(
+                tasks, workers=workers, per_sheet=per_sheet, streaming=streaming, spill_threshold=spill_threshold,
+                engine=engine, sheet_filter=sheet_filter, backend=backend, cancel=cancel):
+            index = pending[task_index]
+            results[index].records, results[index].errors, results[index].sheet_stats = records, errors, stats
+            results[index].seconds = sum(entry.get("seconds", 0) for entry in stats)
+            results[index].source = "parsed"
+            finish(index)
+            done += 1
+            if on_progress is not None:
+                on_progress(done, len(pending), None)
+    else:
+        for index in pending:
+            if cancel is not None and cancel.is_set():
+                break
+            name, data = files[index]
+            if on_progress is not None:
+                on_progress(done, len(pending), name)
+            start = time.perf_counter()
+            try:
+                results[index].records, results[index].errors, results[index].sheet_stats = extract_file(
+                    data, streaming=streaming, spill_threshold=spill_threshold, engine=engine,
+                    sheet_filter=sheet_filter, backend=backend)
+            except Exception as e:
+                results[index].errors = [(None, str(e))]
+            results[index].seconds = time.perf_counter() - start
+            results[index].source = "parsed"
+            finish(index)
+            done += 1
+
+    for result in results:
+        if result.source == "pending":
+            result.source = "cancelled"
+    if on_progress is not None and pending:
+        on_progress(done, len(pending), None)
+    return results
+
+
+def merge_ranks(file_names, by_name=True):
+    """每个文件在合并顺序中的位置，可作为 SpillingRecordStore 的分组"""
+    if not by_name:
+        return list(range(len(file_names)))
+    ranks = [0] * len(file_names)
+    for rank, index in enumerate(merge_order(file_names)):
+        ranks[index] = rank
+    return ranks
+
+
+def ordered(results, by_name=True):
+    """按合并顺序返回结果：by_name 时按 (文件名, 输入顺序)，否则保持输入顺序；未完成的文件不参与合并"""
+    results = [result for result in results if result.finished]
+    if not by_name:
+        return results
+    return [results[index] for index in merge_order([result.name for result in results])]
+
+
+def run_stats(results):
+    """所有文件的工作表统计，按输入顺序排列"""
+    return [entry for result in results for entry in result.stats()]
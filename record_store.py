@@ -0,0 +1,269 @@
+import os
+import sqlite3
+import tempfile
+import threading
+from array import array
+from contextlib import closing
+
+from extractors import RECORD_FIELDS
+
+# ============================
+# 列式记录容器
+# ============================
+
+# 字典编码存储的文本列
+TEXT_FIELDS = ["日期", "姓名", "批次号", "产品名称", "计量单位", "车间名称", "备注"]
+# 以 double 数组存储的数值列
+NUMERIC_FIELDS = ["数量", "单价", "金额"]
+
+
+class RecordStore:
+    """
+    列式记录容器，可替代提取器写入的 data_list。
+
+    文本列做字典编码：每个不同的取值只保存一次，每条记录只占一个 uint32 编号；
+    数值列保存在 array('d') 中。提取器仍然调用 append(记录字典)，
+    写出时通过 iter_rows() 按 RECORD_FIELDS 顺序逐条生成元组。
+    """
+
+    def __init__(self):
+        self._codes = {field: array("I") for field in TEXT_FIELDS}
+        self._values = {field: [] for field in TEXT_FIELDS}
+        self._lookup = {field: {} for field in TEXT_FIELDS}
+        self._numbers = {field: array("d") for field in NUMERIC_FIELDS}
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for row in self.iter_rows():
+            yield dict(zip(RECORD_FIELDS, row))
+
+    def _encode(self, field, value):
+        # 非字符串按 (类型, 值) 编码，避免 1、1.0、True 被合并成同一个取值
+        key = value if type(value) is str else (type(value), value)
+        lookup = self._lookup[field]
+        code = lookup.get(key)
+        if code is None:
+            code = lookup[key] = len(self._values[field])
+            self._values[field].append(value)
+        self._codes[field].append(code)
+
+    def append(self, record):
+        """追加一条记录字典（与 list.append 兼容，提取器可直接写入）"""
+        for field in TEXT_FIELDS:
+            self._encode(field, record.get(field, ""))
+        for field in NUMERIC_FIELDS:
+            self._numbers[field].append(float(record.get(field) or 0))
+        self._length += 1
+
+    def append_row(self, row):
+        """追加一条按 RECORD_FIELDS 排列的记录元组"""
+        self.append(dict(zip(RECORD_FIELDS, row)))
+
+    def extend(self, records):
+        for record in records:
+            if isinstance(record, dict):
+                self.append(record)
+            else:
+                self.append_row(record)
+
+    def extend_rows(self, rows):
+        for row in rows:
+            self.append_row(row)
+
+    def iter_rows(self, start=0, stop=None):
+        """按 RECORD_FIELDS 顺序逐条生成记录元组"""
+        stop = self._length if stop is None else min(stop, self._length)
+        columns = []
+        for field in RECORD_FIELDS:
+            if field in self._numbers:
+                columns.append((None, self._numbers[field]))
+            else:
+                columns.append((self._values[field], self._codes[field]))
+        for index in range(start, stop):
+            yield tuple(data[index] if values is None else values[data[index]]
+                        for values, data in columns)
+
+    @property
+    def nbytes(self):
+        """近似内存占用（编号与数值数组 + 去重后的文本）"""
+        total = sum(codes.itemsize * len(codes) for codes in self._codes.values())
+        total += sum(numbers.itemsize * len(numbers) for numbers in self._numbers.values())
+        for values in self._values.values():
+            total += sum(len(value) * 2 if isinstance(value, str) else 8 for value in values)
+        return total
+
+    def to_dataframe(self):
+        """转换为 pandas DataFrame：纯文本列为 category 类型（直接复用编号），数值列为 float64"""
+        import numpy as np
+        import pandas as pd
+
+        data = {}
+        for field in RECORD_FIELDS:
+            if field in self._numbers:
+                data[field] = np.frombuffer(self._numbers[field], dtype=np.float64).copy()
+                continue
+            values = self._values[field]
+            codes = np.frombuffer(self._codes[field], dtype=np.uint32).astype(np.int64)
+            if all(type(value) is str for value in values):
+                data[field] = pd.Categorical.from_codes(codes, categories=pd.Index(values, dtype=object))
+            else:
+                lookup = np.empty(len(values), dtype=object)
+                lookup[:] = values
+                data[field] = lookup[codes]
+        return pd.DataFrame(data, columns=RECORD_FIELDS)
+
+
+# ============================
+# 限制内存的记录容器
+# ============================
+#
+# 全年报表重新处理时记录数可达数百万条。SpillingRecordStore 先把记录放在内存中的 RecordStore 里，
+# 估算占用超过 memory_limit 后整块写入临时 SQLite 文件并清空内存，之后每攒满一块再写一次；
+# 读取时按 (分组, 组内顺序) 从文件中流式读出。内存占用只取决于 memory_limit，不随输入文件数增长。
+
+# 默认的内存上限（字节）
+RECORDS_MEMORY_LIMIT_BYTES = 256 * 1024 * 1024
+
+# 从临时文件读取时每批的记录数
+SPILL_FETCH_ROWS = 5000
+
+# 临时文件中的列名（列不声明类型，SQLite 原样保存 int/float/str/None）
+_SPILL_COLUMNS = [f"c{index}" for index in range(len(RECORD_FIELDS))]
+
+
+class SpillingRecordStore:
+    """
+    内存占用有上限的记录容器，可代替 RecordStore 作为输出和汇总的记录来源（见 writers.iter_record_rows）。
+
+    记录按分组追加，读取顺序为 (分组, 追加顺序)：并行处理时文件按完成顺序写入，
+    以合并顺序作为分组即可得到与逐个处理相同的输出顺序。可以在另一个线程写入的同时读取，
+    读取结果为开始读取时已写入的记录。
+    """
+
+    def __init__(self, memory_limit=RECORDS_MEMORY_LIMIT_BYTES, directory=None):
+        self.memory_limit = memory_limit
+        self.directory = directory
+        self.path = None
+        self._conn = None
+        self._memory = {}  # 分组 -> RecordStore
+        self._next_seq = {}  # 分组 -> 下一条记录的组内序号
+        self._length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for row in self.iter_rows():
+            yield dict(zip(RECORD_FIELDS, row))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    @property
+    def spilled(self):
+        """是否已有记录写入临时文件"""
+        return self.path is not None
+
+    def extend_rows(self, rows, group=0):
+        """追加一组按 RECORD_FIELDS 排列的记录元组"""
+        with self._lock:
+            store = self._memory.get(group)
+            if store is None:
+                store = self._memory[group] = RecordStore()
+            count = len(store)
+            store.extend_rows(rows)
+            self._length += len(store) - count
+            if self.memory_limit is not None and self._memory_nbytes() > self.memory_limit:
+                self._flush()
+
+    def extend(self, records, group=0):
+        self.extend_rows((record if not isinstance(record, dict) else
+                          tuple(record.get(key, "") for key in RECORD_FIELDS) for record in records), group)
+
+    def _memory_nbytes(self):
+        return sum(store.nbytes for store in self._memory.values())
+
+    def _open(self):
+        fd, self.path = tempfile.mkstemp(suffix=".sqlite3", prefix="records_", dir=self.directory)
+        os.close(fd)
+        # 写入在持锁时进行，连接可以在不同线程中使用
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(f"CREATE TABLE records (grp INTEGER NOT NULL, seq INTEGER NOT NULL, "
+                           f"{', '.join(_SPILL_COLUMNS)}, PRIMARY KEY (grp, seq)) WITHOUT ROWID")
+
+    def _flush(self):
+        """将内存中的全部记录写入临时文件（调用方持有锁）"""
+        if not self._memory:
+            return
+        if self._conn is None:
+            self._open()
+        placeholders = ", ".join("?" * (2 + len(_SPILL_COLUMNS)))
+        with self._conn:
+            for group, store in self._memory.items():
+                start = self._next_seq.get(group, 0)
+                self._conn.executemany(
+                    f"INSERT INTO records (grp, seq, {', '.join(_SPILL_COLUMNS)}) VALUES ({placeholders})",
+                    ((group, start + seq) + row for seq, row in enumerate(store.iter_rows())))
+                self._next_seq[group] = start + len(store)
+        self._memory = {}
+
+    def spill(self):
+        """将内存中的全部记录写入临时文件，之后只占用磁盘（如结果需要长时间保留时）"""
+        with self._lock:
+            self._flush()
+
+    def iter_rows(self):
+        """按 (分组, 追加顺序) 逐条生成记录元组"""
+        for _, row in self.iter_group_rows():
+            yield row
+
+    def iter_group_rows(self):
+        """按 (分组, 追加顺序) 逐条生成 (分组, 记录元组)"""
+        with self._lock:
+            if self._conn is None:
+                # 尚未写入临时文件：RecordStore 只会追加，按当前长度读取即可，不需要持锁
+                snapshot = [(group, self._memory[group], len(self._memory[group])) for group in sorted(self._memory)]
+            else:
+                self._flush()
+                snapshot = None
+        if snapshot is not None:
+            for group, store, length in snapshot:
+                for row in store.iter_rows(0, length):
+                    yield group, row
+            return
+        # 单独的只读连接；一条 SELECT 语句在 WAL 模式下读取的是开始时的快照
+        with closing(sqlite3.connect(self.path)) as conn:
+            cursor = conn.execute(f"SELECT grp, {', '.join(_SPILL_COLUMNS)} FROM records ORDER BY grp, seq")
+            while True:
+                rows = cursor.fetchmany(SPILL_FETCH_ROWS)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row[0], row[1:]
+
+    def close(self):
+        """关闭并删除临时文件"""
+        conn, self._conn = getattr(self, "_conn", None), None
+        if conn is not None:
+            conn.close()
+        path, self.path = getattr(self, "path", None), None
+        if path is not None:
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(path + suffix)
+                except FileNotFoundError:
+                    pass
+        self._memory = {}
+        self._length = 0
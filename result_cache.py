@@ -0,0 +1,87 @@
+import sys
+import threading
+from collections import OrderedDict
+
+from extractors import EXTRACTOR_VERSION
+
+# ============================
+# 提取结果缓存
+# ============================
+#
+# 以 (提取规则版本, 文件内容摘要) 为键缓存单个文件的提取结果，进程内所有会话共享。
+# 条目数和估算字节数任一超出上限时，按最近最少使用 (LRU) 的顺序淘汰。
+
+RESULT_CACHE_MAX_ENTRIES = 500
+RESULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+
+def _estimate_bytes(records):
+    """估算记录元组列表的内存占用（元组本身 + 文本字段）"""
+    total = sys.getsizeof(records)
+    for record in records:
+        total += sys.getsizeof(record)
+        for value in record:
+            if isinstance(value, str):
+                total += sys.getsizeof(value)
+            else:
+                total += 24
+    return total
+
+
+class ResultCache:
+    def __init__(self, max_entries=RESULT_CACHE_MAX_ENTRIES, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # 键 -> (记录元组, 错误列表, 字节数)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(fingerprint, rules=""):
+        """rules: 工作表筛选规则摘要，见 SheetFilter.signature"""
+        return f"{EXTRACTOR_VERSION}:{fingerprint}:{rules}" if rules else f"{EXTRACTOR_VERSION}:{fingerprint}"
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def get(self, key):
+        """命中时返回 (记录元组, 错误列表) 并将条目移到最近使用的位置，未命中返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, key, records, errors=()):
+        records = tuple(records)
+        errors = tuple(errors)
+        size = _estimate_bytes(records)
+        if size > self.max_bytes:
+            # 单个结果超过总预算时不缓存
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (records, errors, size)
+            self._bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
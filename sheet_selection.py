@@ -0,0 +1,77 @@
+import hashlib
+from fnmatch import fnmatchcase
+from itertools import islice
+
+from extractors import BaozhuangExtractor, DataValidator
+
+# ============================
+# 工作表筛选
+# ============================
+#
+# 报表文件中常带有汇总、图表数据、归档等工作表，它们不会产生有效记录，但按默认规则会交给
+# BaozhuangExtractor 完整解析。解析前先按名称规则筛选，再只读取前几行预检是否有人员数据行，
+# 未通过的工作表不再解析，并在统计中记录跳过原因。
+
+
+def _match(pattern, sheet_name):
+    """含通配符 (* ? [) 时按通配符匹配整个名称，否则按包含关系匹配（与 create_extractor 一致）"""
+    if any(char in pattern for char in "*?["):
+        return fnmatchcase(sheet_name, pattern)
+    return pattern in sheet_name
+
+
+def parse_patterns(text):
+    """将逗号/换行分隔的规则文本拆分为列表"""
+    return [item.strip() for item in text.replace("，", ",").replace("\n", ",").split(",") if item.strip()]
+
+
+def has_worker_rows(rows):
+    """任一行的姓名列（绕肉/制作表第 2 列，包装表每个 8 列块的第 2 列）有有效姓名即视为有人员数据行"""
+    for row in rows:
+        for value in row[1::BaozhuangExtractor.BLOCK_SIZE]:
+            if value and DataValidator.is_valid_name(value):
+                return True
+    return False
+
+
+class SheetFilter:
+    """
+    工作表筛选规则：
+        include: 名称规则列表，非空时只处理匹配任一规则的工作表
+        exclude: 名称规则列表，匹配任一规则的工作表不处理（优先于 include）
+        probe_rows: 预检行数，前 probe_rows 行中没有人员数据行的工作表不处理；0 表示不预检
+    """
+
+    def __init__(self, include=(), exclude=(), probe_rows=0):
+        self.include = list(include)
+        self.exclude = list(exclude)
+        self.probe_rows = probe_rows
+
+    @property
+    def active(self):
+        return bool(self.include or self.exclude or self.probe_rows)
+
+    def signature(self):
+        """规则摘要；规则会改变提取结果，因此参与结果缓存和增量数据库的版本判断。未设置规则时为空字符串"""
+        if not self.active:
+            return ""
+        text = "\n".join(["include"] + self.include + ["exclude"] + self.exclude + [f"probe={self.probe_rows}"])
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+    def name_skip_reason(self, sheet_name):
+        """按名称判断是否跳过，返回跳过原因；需要处理时返回 None"""
+        for pattern in self.exclude:
+            if _match(pattern, sheet_name):
+                return f"名称匹配排除规则 '{pattern}'"
+        if self.include and not any(_match(pattern, sheet_name) for pattern in self.include):
+            return "名称不匹配任何包含规则"
+        return None
+
+    def probe_skip_reason(self, ws):
+        """只读取前 probe_rows 行预检，返回 (跳过原因或 None, 读取的行数)"""
+        if not self.probe_rows:
+            return None, 0
+        rows = list(islice(ws.iter_rows(values_only=True), self.probe_rows))
+        if has_worker_rows(rows):
+            return None, len(rows)
+        return f"前 {self.probe_rows} 行中没有人员数据行", len(rows)
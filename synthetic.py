@@ -0,0 +1,159 @@
+"""
+生成模拟的车间日报工作簿，用于基准测试和提取结果校验。
+
+示例：
+    python synthetic.py /tmp/日报 --files 4 --rows 5000 --groups 4 --blocks 3
+"""
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+
+import openpyxl
+
+# ============================
+# 模拟数据
+# ============================
+#
+# 绕肉/制作表：标题、日期、批次号行之后是若干表头段，每段为 “批次号/产品名称” 行 + 表头行
+# (数量/单价/金额/备注 × 列组数) + 人员行，段之间穿插合计行和新的日期行。
+# 包装/挑选表：每行若干个 8 列块（日期、姓名、批次号、产品名称、数量、单价、金额、备注）。
+# 取值混合了数字、数字文本、空白、无法解析的文本和各种日期写法，覆盖提取器的各个分支。
+
+WORKER_NAMES = ["张三", "李四", "王五", "赵六", "孙七", "周八", "吴九", "郑十", "陈小红", "林大伟",
+                "黄丽", "何强", "罗敏", "梁静", "宋杰", "唐亮", "许娟", "韩梅", "冯刚", "邓超"]
+PRODUCT_NAMES = ["5\"*12g漂白皮卷绕鸭肉", "螺旋三明治", "拆钩子", "鸡肉干", "鸭肉卷", "牛皮骨", "鳕鱼条", "鸡胸肉片"]
+NOTES = ["返工", "加班", "夜班", "补单", "试产"]
+
+START_DATE = datetime(2024, 3, 1)
+
+# 各工作表的版式：绕肉/制作为表头段版式，包装/挑选为 8 列块版式，汇总表不产生记录
+SHEETS = [("绕肉", "band"), ("制作", "band"), ("包装", "block"), ("挑选", "block"), ("月度汇总", "summary")]
+
+
+def _quantity(rng):
+    return rng.choice([rng.randint(1, 200), round(rng.uniform(0.5, 80), 2), str(rng.randint(1, 50)),
+                       None, None, "", " ", "x", 0])
+
+
+def _price(rng):
+    return rng.choice([round(rng.uniform(0.1, 5), 2), str(round(rng.uniform(0.1, 5), 1)), None, 0])
+
+
+def _amount(rng, quantity, price):
+    if rng.random() < 0.4 and isinstance(quantity, (int, float)) and isinstance(price, (int, float)):
+        return round(quantity * price, 2)
+    return rng.choice([None, 0, "", "abc", round(rng.uniform(1, 300), 2)])
+
+
+def _date_cell(rng, day):
+    """同一天的几种写法：datetime 单元格、文本、Excel 日期序号"""
+    value = START_DATE + timedelta(days=day)
+    return rng.choice([value, value.strftime("%Y-%m-%d"), f"{value.year}年{value.month}月{value.day}日",
+                       (value - datetime(1899, 12, 30)).days])
+
+
+def write_band_sheet(ws, rows, groups, rng, bands=3):
+    """绕肉/制作版式：rows 为人员行总数，平均分到各表头段"""
+    day = 0
+    ws.append(["优萌宠物车间生产日报表"])
+    ws.append([f"日期：{START_DATE.year}年{START_DATE.month}月{START_DATE.day}日", None,
+               f"批次号：B{rng.randint(100, 999)}"])
+    per_band = max(1, rows // bands)
+    for band in range(bands):
+        above = [None, None]
+        header = ["序号", "姓名"]
+        for group in range(groups):
+            product = rng.choice(PRODUCT_NAMES) if rng.random() < 0.9 else None
+            above += [f"B{band}{group}{rng.randint(10, 99)}", product, None, None]
+            header += ["数量", "单价", "金额", "备注"]
+        ws.append(above)
+        ws.append(header)
+        for index in range(per_band):
+            if rng.random() < 0.95:
+                row = [index + 1, rng.choice(WORKER_NAMES)]
+            else:
+                # 没有有效姓名的行按元数据行处理，序号会被当作 Excel 日期序号解析，因此不填序号
+                row = [None, rng.choice(["合计", None, "甲"])]
+            for group in range(groups):
+                quantity = _quantity(rng)
+                price = _price(rng)
+                row += [quantity, price, _amount(rng, quantity, price),
+                        rng.choice(NOTES) if rng.random() < 0.05 else None]
+            ws.append(row)
+            if rng.random() < 0.02:
+                day += 1
+                ws.append([None, None, _date_cell(rng, day)])
+        ws.append([None, "合计"] + [None] * (groups * 4))
+
+
+def write_block_sheet(ws, rows, blocks, rng):
+    """包装/挑选版式：每行 blocks 个 8 列块，后面的块越来越稀疏"""
+    ws.append(["包装车间日报", None, f"批号：P{rng.randint(100, 999)}"])
+    ws.append([f"日期：{START_DATE.strftime('%Y/%m/%d')}"])
+    ws.append(["日期", "姓名", "批次号", "产品名称", "数量", "单价", "金额", "备注"] * blocks)
+    for _ in range(rows):
+        row = []
+        for block in range(blocks):
+            if rng.random() < block * 0.25:
+                row += [None] * 8
+                continue
+            quantity = _quantity(rng)
+            price = _price(rng)
+            row += [_date_cell(rng, rng.randint(0, 27)) if rng.random() < 0.3 else None,
+                    rng.choice(WORKER_NAMES) if rng.random() < 0.9 else rng.choice(["合计", "姓名", None]),
+                    rng.choice([f"P{rng.randint(1, 9)}", rng.randint(1, 9), None]),
+                    rng.choice(PRODUCT_NAMES) if rng.random() < 0.9 else rng.choice(["产品名称", None, 5]),
+                    quantity, price, _amount(rng, quantity, price),
+                    rng.choice(NOTES) if rng.random() < 0.05 else None]
+        ws.append(row)
+
+
+def write_summary_sheet(ws, rows, rng):
+    """不含人员数据的汇总表"""
+    ws.append(["产品", "本月数量", "本月金额"])
+    for _ in range(rows):
+        ws.append([rng.choice(PRODUCT_NAMES), rng.randint(100, 9000), round(rng.uniform(100, 90000), 2)])
+
+
+def make_workbook(path, rows=1000, groups=3, blocks=3, seed=0):
+    """生成一个包含全部版式的工作簿；rows 为每个工作表的人员行数"""
+    rng = random.Random(seed)
+    wb = openpyxl.Workbook(write_only=True)
+    for sheet_name, layout in SHEETS:
+        ws = wb.create_sheet(sheet_name)
+        if layout == "band":
+            write_band_sheet(ws, rows, groups, rng)
+        elif layout == "block":
+            write_block_sheet(ws, rows, blocks, rng)
+        else:
+            write_summary_sheet(ws, min(rows, 200), rng)
+    wb.save(path)
+    return path
+
+
+def generate(out_dir, files=1, rows=1000, groups=3, blocks=3, seed=0):
+    """在 out_dir 中生成 files 个工作簿（文件名满足 is_report_file），返回文件路径列表"""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for index in range(files):
+        path = os.path.join(out_dir, f"优萌车间生产日报_{index + 1:03d}.xlsx")
+        paths.append(make_workbook(path, rows=rows, groups=groups, blocks=blocks, seed=seed + index))
+    return paths
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="生成模拟的车间日报工作簿")
+    parser.add_argument("out_dir", help="输出目录")
+    parser.add_argument("--files", type=int, default=1, help="文件数")
+    parser.add_argument("--rows", type=int, default=1000, help="每个工作表的人员行数")
+    parser.add_argument("--groups", type=int, default=3, help="绕肉/制作表每个表头段的列组数")
+    parser.add_argument("--blocks", type=int, default=3, help="包装/挑选表每行的 8 列块数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子，相同参数和种子生成相同内容")
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    for path in generate(args.out_dir, args.files, args.rows, args.groups, args.blocks, args.seed):
+        print(path)
@@ -0,0 +1,80 @@
+from dedup import (CONFLICT, EXACT, MODIFIED_TIME, DeduplicatedRecords, DuplicateIndex, index_files,
+                   ranked_file_rows)
+
+
+def row(name, quantity, product="产品A", date="2024-03-01", batch="B1"):
+    return (date, name, batch, product, quantity, "kg", 2.0, quantity * 2.0, "包装", "")
+
+
+# 合并顺序按文件名：更正版本排在原版本之前
+ORIGINAL = [row("张三", 10.0), row("李四", 5.0), row("王五", 3.0)]
+CORRECTED = [row("张三", 12.0), row("李四", 5.0)]
+FILES = [("生产日报_0301(更正).xlsx", CORRECTED), ("生产日报_0301.xlsx", ORIGINAL)]
+
+
+def build_index(recency):
+    """recency: 两个文件（按合并顺序）的新旧"""
+    index = DuplicateIndex(MODIFIED_TIME)
+    # 按完成顺序加入，与合并顺序无关
+    for rank in (1, 0):
+        file_name, rows = FILES[rank]
+        index.add_file(rank, file_name, rows, recency[rank], f"t{recency[rank]}")
+    return index
+
+
+def kept_rows(index, policy):
+    return list(DeduplicatedRecords(lambda: ranked_file_rows((name, None, rows) for name, rows in FILES),
+                                    index, policy).iter_rows())
+
+
+def test_classification():
+    index = build_index([2, 1])
+    assert len(index) == 2
+    assert index.counts() == (1, 1)
+    table = index.conflict_table("report-only")
+    kinds = dict(zip(table["姓名"], table["类型"]))
+    assert kinds == {"张三": CONFLICT, "李四": EXACT}
+    assert set(table["处理"]) == {"保留"}
+    assert set(table["保留文件"]) == {""}
+
+
+def test_same_file_keys_are_not_duplicates():
+    index = DuplicateIndex()
+    index.add_file(0, "a.xlsx", [row("张三", 1.0), row("张三", 2.0)], 0)
+    index.add_file(1, "b.xlsx", [row("李四", 1.0)], 1)
+    assert len(index) == 0 and index.total == 3
+
+
+def test_keep_latest_uses_recency_not_file_name():
+    # 更正版本较新，但在合并顺序中排在前面
+    index = build_index([2, 1])
+    assert index.dropped("keep-latest") == 2
+    assert kept_rows(index, "keep-latest") == CORRECTED + [row("王五", 3.0)]
+    table = index.conflict_table("keep-latest")
+    assert set(table["保留文件"]) == {"生产日报_0301(更正).xlsx"}
+    assert set(table["原因"]) == {"修改时间最新"}
+    assert table.loc[table["文件"] == "生产日报_0301.xlsx", "处理"].tolist() == ["删除", "删除"]
+    assert table.loc[table["文件"] == "生产日报_0301(更正).xlsx", "新旧依据"].tolist() == ["修改时间 t2"] * 2
+
+
+def test_keep_first():
+    index = build_index([2, 1])
+    assert index.dropped("keep-first") == 2
+    assert kept_rows(index, "keep-first") == ORIGINAL
+    assert set(index.conflict_table("keep-first")["原因"]) == {"修改时间最早"}
+
+
+def test_equal_recency_falls_back_to_merge_order():
+    index = build_index([1, 1])
+    assert kept_rows(index, "keep-latest") == ORIGINAL
+    assert kept_rows(index, "keep-first") == CORRECTED + [row("王五", 3.0)]
+    reasons = set(index.conflict_table("keep-latest")["原因"])
+    assert reasons == {"修改时间最新（修改时间相同，取合并顺序中最后的文件）"}
+
+
+def test_index_files_uses_ingested_time():
+    files = [("a.xlsx", "2024-03-02T08:00:00", [row("张三", 1.0)]),
+             ("b.xlsx", "2024-03-01T08:00:00", [row("张三", 2.0)])]
+    index = index_files(files)
+    assert index.owners("keep-latest") == {("2024-03-01", "张三", "包装", "产品A", "B1"): 0}
+    assert list(index.conflict_table("keep-latest")["原因"]) == ["入库时间最新"] * 2
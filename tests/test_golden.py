@@ -0,0 +1,6 @@
+import benchmark
+
+
+def test_golden_records():
+    """所有读取方式 / 处理引擎组合的提取结果与 golden_records.json 一致（同 benchmark.py --check-golden）"""
+    assert benchmark.check_golden() == []
@@ -0,0 +1,24 @@
+from datetime import date, datetime
+
+import pytest
+
+from incremental import RecordDatabase, parse_date
+
+
+def record(day):
+    return (f"2024/03/{day:02d}", "张三", "B1", "产品A", 1.0, "", 2.0, 2.0, "包装", "")
+
+
+def test_parse_date():
+    assert parse_date("2024-3-1") == parse_date("2024/03/01") == parse_date(datetime(2024, 3, 1, 8)) == date(2024, 3, 1)
+    for text in ("2024-13-01", "3月1日", ""):
+        with pytest.raises(ValueError):
+            parse_date(text)
+
+
+def test_date_range_is_zero_padded(tmp_path):
+    database = RecordDatabase(str(tmp_path / "records.sqlite3"))
+    database.replace_file("f1", "生产日报_0301.xlsx", [record(day) for day in (1, 9, 10, 31)])
+    assert database.count("2024-3-1", "2024-3-31") == 4
+    assert database.count("2024-3-2", "2024-3-10") == 2
+    assert database.count(date(2024, 3, 10), None) == 2
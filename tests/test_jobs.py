@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+
+import pytest
+
+import jobs
+import synthetic
+from background import BackgroundRun
+from jobs import JobQueue, JobRejected
+
+
+class GatedRun(BackgroundRun):
+    """开始后等待 gate 置位才处理文件，用来让作业停在“处理中”"""
+
+    gate = None
+
+    def _run(self):
+        self.gate.wait(10)
+        super()._run()
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    event = threading.Event()
+    monkeypatch.setattr(GatedRun, "gate", event)
+    monkeypatch.setattr(jobs, "BackgroundRun", GatedRun)
+    yield event
+    event.set()
+
+
+@pytest.fixture(scope="module")
+def report(tmp_path_factory):
+    path = synthetic.make_workbook(str(tmp_path_factory.mktemp("jobs") / "生产日报.xlsx"), rows=5, groups=1, blocks=1)
+    with open(path, "rb") as f:
+        return [("生产日报.xlsx", f.read())]
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_admission_limits(gate, report):
+    size = len(report[0][1])
+    queue = JobQueue(max_running=1, max_queued=1, max_queued_bytes=size, max_files=2, max_bytes=2 * size)
+    with pytest.raises(JobRejected, match="一次最多处理 2 个文件"):
+        queue.submit(report * 3)
+    with pytest.raises(JobRejected, match="超过单个作业的上限"):
+        queue.submit([(name, data * 3) for name, data in report])
+    running = queue.submit(report)
+    wait_until(lambda: running.state == "running")
+    with pytest.raises(JobRejected, match="排队的作业文件过多"):
+        queue.submit(report * 2)
+    queued = queue.submit(report)
+    with pytest.raises(JobRejected, match="已有 1 个作业在排队"):
+        queue.submit(report)
+    assert queue.stats()["running"] == 1 and queue.stats()["queued"] == 1
+    gate.set()
+    wait_until(lambda: not queued.active)
+    assert (running.state, queued.state) == ("done", "done")
+
+
+def test_workers_capped(gate, report):
+    queue = JobQueue(max_workers=2)
+    job = queue.submit(report, workers=8)
+    assert job.run.options["workers"] == 2
+
+
+def test_position_and_cancel(gate, report):
+    queue = JobQueue(max_running=1)
+    first = queue.submit(report, owner="a")
+    wait_until(lambda: first.state == "running")
+    second = queue.submit(report, owner="b")
+    third = queue.submit(report, owner="a")
+    assert [queue.position(job) for job in (first, second, third)] == [None, 1, 2]
+    assert queue.jobs("a") == [first, third]
+
+    queue.cancel(second)
+    assert second.state == "cancelled" and second.dropped and second.finished_at is not None
+    assert second.run.files is None
+    assert queue.position(second) is None and queue.position(third) == 1
+
+    gate.set()
+    wait_until(lambda: not third.active)
+    assert (first.state, third.state) == ("done", "done")
+    assert not second.started
+    assert len(third.run.to_store()) == len(first.run.to_store()) > 0
+
+
+def test_cancel_running_job(gate, report):
+    queue = JobQueue(max_running=1)
+    job = queue.submit(report * 2)
+    wait_until(lambda: job.state == "running")
+    queue.cancel(job)
+    gate.set()
+    wait_until(lambda: not job.active)
+    assert job.state == "cancelled"
+
+
+def test_retention_purge(gate, report):
+    queue = JobQueue(max_running=1, memory_limit=1, retention_seconds=60, max_retained=2)
+    gate.set()
+    finished = []
+    for _ in range(3):
+        job = queue.submit(report)
+        wait_until(lambda: job.finished_at is not None)
+        finished.append(job)
+    # 超出保留数量：最早结束的作业被删除，其临时文件随之删除
+    oldest = finished[0]
+    assert queue.get(oldest.id) is None
+    assert oldest.run.store.path is None
+    paths = [job.run.store.path for job in finished[1:]]
+    assert all(path is not None and os.path.exists(path) for path in paths)
+
+    assert queue.purge(now=finished[-1].finished_at + 30) == 0
+    assert queue.purge(now=finished[-1].finished_at + 61) == 2
+    assert queue.jobs() == []
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def test_finished_job_released_to_disk(gate, report):
+    queue = JobQueue(max_running=1)
+    gate.set()
+    job = queue.submit(report)
+    wait_until(lambda: job.finished_at is not None)
+    # 记录远小于内存上限，运行中留在内存里；结束后全部写入作业目录
+    assert job.run.store.spilled and os.path.dirname(job.run.store.path) == job.directory
+    assert len(job.run.store) == len(list(job.run.store.iter_rows())) > 0
+    assert job.retained_bytes() > 0 and queue.retained_bytes() == job.retained_bytes()
+    queue.purge(now=job.finished_at + queue.retention_seconds + 1)
+    assert not os.path.exists(job.directory)
+
+
+def test_retained_bytes_limit(gate, report):
+    queue = JobQueue(max_running=1)
+    gate.set()
+    first = queue.submit(report)
+    wait_until(lambda: first.finished_at is not None)
+    with open(first.path("结果.xlsx"), "wb") as f:
+        f.write(b"x" * 1000)
+    queue.max_retained_bytes = first.retained_bytes() + 500
+    second = queue.submit(report)
+    wait_until(lambda: second.finished_at is not None)
+    queue.purge()
+    # 超出保留空间时删除最早结束的作业
+    assert queue.jobs() == [second]
+    assert not os.path.exists(first.directory)
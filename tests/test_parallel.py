@@ -0,0 +1,33 @@
+import os
+
+import parallel
+import synthetic
+
+_extract_file_task = parallel._extract_file_task
+
+# 内容为该值的“文件”会让工作进程直接退出，模拟内存不足被系统终止
+CRASH = b"crash"
+
+
+def _crashing_file_task(data, *args):
+    if data == CRASH:
+        os._exit(1)
+    return _extract_file_task(data, *args)
+
+
+def test_broken_pool_is_rebuilt(tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel, "_extract_file_task", _crashing_file_task)
+    path = synthetic.make_workbook(str(tmp_path / "生产日报.xlsx"), rows=5, groups=1, blocks=1)
+    with open(path, "rb") as f:
+        content = f.read()
+    files = [("崩溃.xlsx", CRASH)] + [(f"生产日报_{index}.xlsx", content) for index in range(4)]
+
+    # 单个工作进程最多同时提交 2 个任务：崩溃时第二个文件也在这个进程池中，之后的文件在新的进程池中处理
+    results = parallel.extract_each_file_parallel(files, workers=1)
+
+    records, errors, _ = results[0]
+    assert records == [] and errors == [(None, parallel.BROKEN_WORKER_MESSAGE)]
+    expected, expected_errors, _ = parallel.extract_file(content)
+    assert expected and not expected_errors
+    for records, errors, _ in results[2:]:
+        assert (records, errors) == (expected, [])
@@ -0,0 +1,44 @@
+import os
+
+from record_store import SpillingRecordStore
+
+
+def make_rows(group, count):
+    return [("2024-03-01", f"员工{group}-{index}", f"B{index}", "产品", float(index), "kg", 1.5, index * 1.5,
+             "包装", "") for index in range(count)]
+
+
+def append_interleaved(store, groups, batch=7):
+    """按组交替分批追加，模拟并行处理时文件按完成顺序写入"""
+    offsets = dict.fromkeys(groups, 0)
+    while any(offsets[group] < len(groups[group]) for group in groups):
+        for group in reversed(list(groups)):
+            rows = groups[group][offsets[group]:offsets[group] + batch]
+            offsets[group] += len(rows)
+            if rows:
+                store.extend_rows(rows, group)
+
+
+def test_order_across_spills(tmp_path):
+    groups = {group: make_rows(group, 50) for group in range(4)}
+    expected = [row for group in sorted(groups) for row in groups[group]]
+    with SpillingRecordStore(memory_limit=4096, directory=str(tmp_path)) as store:
+        append_interleaved(store, groups)
+        assert store.spilled
+        assert len(store) == len(expected)
+        assert list(store.iter_rows()) == expected
+        # 读取后继续写入，新记录按组内顺序排在同组已有记录之后
+        store.extend_rows(make_rows(9, 3), 0)
+        assert list(store.iter_rows()) == groups[0] + make_rows(9, 3) + expected[50:]
+        path = store.path
+    assert not os.path.exists(path)
+
+
+def test_order_without_spill(tmp_path):
+    groups = {group: make_rows(group, 20) for group in range(3)}
+    with SpillingRecordStore(memory_limit=None, directory=str(tmp_path)) as store:
+        append_interleaved(store, groups)
+        assert not store.spilled
+        assert [group for group, _ in store.iter_group_rows()] == [group for group in range(3) for _ in range(20)]
+        assert list(store.iter_rows()) == [row for group in range(3) for row in groups[group]]
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,133 @@
+import csv
+import io
+from io import BytesIO
+
+import openpyxl
+
+from extractors import RECORD_FIELDS
+
+# ============================
+# 结果输出
+# ============================
+#
+# 所有写出函数都按 RECORD_FIELDS 的列顺序逐行流式写出，记录来源可以是记录字典、
+# 记录元组或任何可迭代对象，写出过程中不会再复制一份完整数据。
+# xlsx 可以附加汇总表（见 aggregation），每个汇总表写为一个工作表；csv/parquet 只有明细。
+
+OUTPUT_FORMATS = {
+    "xlsx": ("生产车间统计数据收集.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("生产车间统计数据收集.csv", "text/csv"),
+    "parquet": ("生产车间统计数据收集.parquet", "application/octet-stream"),
+}
+
+# 写 Parquet 时每个行组的记录数
+PARQUET_CHUNK_ROWS = 50000
+
+# Parquet 中按浮点数存储的列
+NUMERIC_FIELDS = ["数量", "单价", "金额"]
+
+
+def iter_record_rows(records):
+    """将记录（字典或元组）统一转为按 RECORD_FIELDS 排列的元组"""
+    if hasattr(records, "iter_rows"):
+        # RecordStore 等列式容器直接按列生成元组，不经过字典
+        yield from records.iter_rows()
+        return
+    for record in records:
+        if isinstance(record, dict):
+            yield tuple(record.get(key, "") for key in RECORD_FIELDS)
+        else:
+            yield tuple(record)
+
+
+def write_xlsx(records, fileobj, summaries=None):
+    """使用只写模式的工作簿逐行追加，不为每个字段创建单元格对象；summaries 为 {工作表名: DataFrame}"""
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("数据收集表")
+    ws.append(RECORD_FIELDS)
+    count = 0
+    for row in iter_record_rows(records):
+        ws.append(row)
+        count += 1
+    for sheet_name, table in (summaries or {}).items():
+        ws = wb.create_sheet(sheet_name)
+        ws.append(list(table.columns))
+        for row in table.itertuples(index=False, name=None):
+            ws.append(row)
+    wb.save(fileobj)
+    return count
+
+
+def write_csv(records, fileobj, summaries=None):
+    """写出 UTF-8 (带 BOM) 的 CSV，Excel 可直接打开中文"""
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    writer = csv.writer(text)
+    writer.writerow(RECORD_FIELDS)
+    count = 0
+    for row in iter_record_rows(records):
+        writer.writerow(row)
+        count += 1
+    text.flush()
+    text.detach()
+    return count
+
+
+def write_parquet(records, fileobj, summaries=None, chunk_rows=PARQUET_CHUNK_ROWS):
+    """按行组分块写出 Parquet，内存中最多保留 chunk_rows 条记录"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("导出 Parquet 需要安装 pyarrow：pip install pyarrow")
+
+    schema = pa.schema([(key, pa.float64() if key in NUMERIC_FIELDS else pa.string())
+                        for key in RECORD_FIELDS])
+    numeric_indexes = {RECORD_FIELDS.index(key) for key in NUMERIC_FIELDS}
+
+    def to_batch(rows):
+        columns = []
+        for index in range(len(RECORD_FIELDS)):
+            if index in numeric_indexes:
+                columns.append([None if row[index] in (None, "") else float(row[index]) for row in rows])
+            else:
+                columns.append([None if row[index] is None else str(row[index]) for row in rows])
+        return pa.record_batch(columns, schema=schema)
+
+    count = 0
+    with pq.ParquetWriter(fileobj, schema) as writer:
+        chunk = []
+        for row in iter_record_rows(records):
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                writer.write_batch(to_batch(chunk))
+                count += len(chunk)
+                chunk = []
+        if chunk or count == 0:
+            writer.write_batch(to_batch(chunk))
+            count += len(chunk)
+    return count
+
+
+WRITERS = {
+    "xlsx": write_xlsx,
+    "csv": write_csv,
+    "parquet": write_parquet,
+}
+
+
+def write_output(records, fileobj, fmt="xlsx", summaries=None):
+    """将记录按指定格式写入文件对象，返回写出的记录数；汇总表只写入 xlsx"""
+    if fmt not in WRITERS:
+        raise ValueError(f"不支持的输出格式: {fmt}")
+    return WRITERS[fmt](records, fileobj, summaries)
+
+
+def save_to_output(data_list, fmt="xlsx", summaries=None):
+    """将数据保存到内存中的 BytesIO 对象，而不是磁盘路径"""
+    if not data_list:
+        return None
+
+    output_buffer = BytesIO()
+    write_output(data_list, output_buffer, fmt, summaries)
+    output_buffer.seek(0) # 将指针移回开头
+    return output_buffer
@@ -0,0 +1,258 @@
+import posixpath
+import zipfile
+from functools import lru_cache
+
+from lxml import etree
+from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+from openpyxl.utils.cell import column_index_from_string, range_boundaries
+from openpyxl.utils.datetime import MAC_EPOCH, WINDOWS_EPOCH, from_excel, from_ISO8601
+
+# ============================
+# lxml 直接读取 xlsx
+# ============================
+#
+# 提取器只需要单元格的值和行列位置，不需要 openpyxl 的单元格/样式对象。这里直接打开 xlsx 压缩包：
+# 共享字符串和日期样式在打开工作簿时解析一次，工作表 XML 用 lxml.etree.iterparse 逐行流式解析，
+# 每行处理完即清除元素，内存占用与只读模式相同。
+#
+# 行元组与 openpyxl 只读模式 iter_rows(values_only=True) 的结果一致：从第 1 行开始，缺失的行补空行，
+# 行宽和行数以 <dimension> 为准；数字按 int/float 返回，日期格式的单元格转换为 datetime。
+
+SHEET_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+ROW_TAG = f"{{{SHEET_MAIN_NS}}}row"
+CELL_TAG = f"{{{SHEET_MAIN_NS}}}c"
+VALUE_TAG = f"{{{SHEET_MAIN_NS}}}v"
+INLINE_STRING_TAG = f"{{{SHEET_MAIN_NS}}}is"
+TEXT_TAG = f"{{{SHEET_MAIN_NS}}}t"
+RUN_TAG = f"{{{SHEET_MAIN_NS}}}r"
+STRING_ITEM_TAG = f"{{{SHEET_MAIN_NS}}}si"
+DIMENSION_TAG = f"{{{SHEET_MAIN_NS}}}dimension"
+SHEET_DATA_TAG = f"{{{SHEET_MAIN_NS}}}sheetData"
+
+
+class UnsupportedWorkbook(Exception):
+    """文件结构不是本读取器支持的 xlsx（如 Strict OOXML），调用方应改用 openpyxl"""
+
+
+def _cast_number(text):
+    """与 openpyxl 一致：含小数点或指数的按 float，其余按 int"""
+    if "." in text or "E" in text or "e" in text:
+        return float(text)
+    return int(text)
+
+
+# 列字母 → 列号，工作表的列数有限，缓存全部
+_column_from_letters = lru_cache(maxsize=None)(column_index_from_string)
+
+
+def _column_index(coordinate):
+    """单元格坐标（如 "AB12"）中的列号，从 1 开始"""
+    return _column_from_letters(coordinate.rstrip("0123456789"))
+
+
+def _text_content(node):
+    """单元格文本：<t> 加上所有富文本片段 <r><t>，不含注音 <rPh>"""
+    if len(node) == 1 and node[0].tag == TEXT_TAG:
+        # 最常见的情况：只有一个纯文本 <t>
+        return node[0].text or ""
+    parts = [node.findtext(TEXT_TAG) or ""]
+    parts.extend(run.findtext(TEXT_TAG) or "" for run in node.iterfind(RUN_TAG))
+    return "".join(parts)
+
+
+def _part_path(base, target):
+    """关系中的 Target 转换为压缩包内路径"""
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), target))
+
+
+def _rels_path(part):
+    return posixpath.join(posixpath.dirname(part), "_rels", posixpath.basename(part) + ".rels")
+
+
+class XmlWorkbook:
+    """只读工作簿，接口与本项目用到的 openpyxl 工作簿部分相同：sheetnames、wb[name]、close()"""
+
+    def __init__(self, source):
+        self._archive = zipfile.ZipFile(source)
+        try:
+            self._load()
+        except Exception:
+            self._archive.close()
+            raise
+
+    def _read_xml(self, path):
+        try:
+            return etree.fromstring(self._archive.read(path))
+        except KeyError:
+            return None
+
+    def _relationships(self, part):
+        root = self._read_xml(_rels_path(part))
+        if root is None:
+            return {}
+        return {rel.get("Id"): (rel.get("Type", ""), _part_path(part, rel.get("Target", "")))
+                for rel in root.iterfind(f"{{{PKG_REL_NS}}}Relationship")}
+
+    def _load(self):
+        workbook_part = "xl/workbook.xml"
+        for rel_type, target in self._relationships("").values():
+            if rel_type.endswith("/officeDocument"):
+                workbook_part = target
+        workbook = self._read_xml(workbook_part)
+        if workbook is None or workbook.tag != f"{{{SHEET_MAIN_NS}}}workbook":
+            raise UnsupportedWorkbook(f"无法识别的工作簿结构: {workbook_part}")
+
+        properties = workbook.find(f"{{{SHEET_MAIN_NS}}}workbookPr")
+        date1904 = properties.get("date1904", "") if properties is not None else ""
+        self.epoch = MAC_EPOCH if date1904.lower() in ("1", "true") else WINDOWS_EPOCH
+
+        rels = self._relationships(workbook_part)
+        self._sheet_paths = {}
+        for sheet in workbook.iter(f"{{{SHEET_MAIN_NS}}}sheet"):
+            rel_type, target = rels.get(sheet.get(f"{{{REL_NS}}}id"), ("", None))
+            # 只处理普通工作表，图表工作表没有单元格
+            if rel_type.endswith("/worksheet") and target in self._archive.NameToInfo:
+                self._sheet_paths[sheet.get("name")] = target
+        self.sheetnames = list(self._sheet_paths)
+
+        shared_strings_path = styles_path = None
+        for rel_type, target in rels.values():
+            if rel_type.endswith("/sharedStrings"):
+                shared_strings_path = target
+            elif rel_type.endswith("/styles"):
+                styles_path = target
+        self.shared_strings = self._read_shared_strings(shared_strings_path)
+        self.date_styles, self.timedelta_styles = self._read_date_styles(styles_path)
+
+    def _read_shared_strings(self, path):
+        if path is None or path not in self._archive.NameToInfo:
+            return []
+        strings = []
+        with self._archive.open(path) as src:
+            for _, node in etree.iterparse(src, tag=STRING_ITEM_TAG):
+                strings.append(_text_content(node).replace("x005F_", ""))
+                node.clear()
+        return strings
+
+    def _read_date_styles(self, path):
+        """返回 (日期格式的样式序号集合, 时长格式的样式序号集合)，与 openpyxl 的判断规则相同"""
+        root = self._read_xml(path) if path else None
+        if root is None:
+            return set(), set()
+        custom = {}
+        for fmt in root.iter(f"{{{SHEET_MAIN_NS}}}numFmt"):
+            custom[int(fmt.get("numFmtId"))] = fmt.get("formatCode")
+        date_styles = set()
+        timedelta_styles = set()
+        cell_xfs = root.find(f"{{{SHEET_MAIN_NS}}}cellXfs")
+        for index, xf in enumerate(cell_xfs.iterfind(f"{{{SHEET_MAIN_NS}}}xf") if cell_xfs is not None else ()):
+            fmt_id = int(xf.get("numFmtId", 0))
+            fmt = custom[fmt_id] if fmt_id in custom else builtin_format_code(fmt_id)
+            if is_date_format(fmt):
+                date_styles.add(index)
+            if is_timedelta_format(fmt):
+                timedelta_styles.add(index)
+        return date_styles, timedelta_styles
+
+    def __getitem__(self, name):
+        return XmlWorksheet(self, name, self._sheet_paths[name])
+
+    def close(self):
+        self._archive.close()
+
+
+class XmlWorksheet:
+    """按行流式读取的工作表，提供 max_column、max_row 和 iter_rows(values_only=True)"""
+
+    # 与 openpyxl 只读工作表一样，单元格不在内存中，提取器按流式方式处理
+    read_only = True
+
+    def __init__(self, workbook, title, path):
+        self.parent = workbook
+        self.title = title
+        self._path = path
+        self.min_column = self.min_row = self.max_column = self.max_row = None
+        self._read_dimensions()
+
+    def _read_dimensions(self):
+        with self.parent._archive.open(self._path) as src:
+            for _, node in etree.iterparse(src, events=("start",), tag=(DIMENSION_TAG, SHEET_DATA_TAG)):
+                if node.tag == DIMENSION_TAG and node.get("ref"):
+                    bounds = range_boundaries(node.get("ref"))
+                    if None not in bounds:
+                        self.min_column, self.min_row, self.max_column, self.max_row = bounds
+                break
+
+    def _parse_rows(self, src):
+        """逐个 <row> 解析，返回 (行号, [(列号, 值), ...])"""
+        shared_strings = self.parent.shared_strings
+        date_styles = self.parent.date_styles
+        timedelta_styles = self.parent.timedelta_styles
+        epoch = self.parent.epoch
+        row_number = 0
+        for _, row in etree.iterparse(src, tag=ROW_TAG):
+            number = row.get("r")
+            row_number = int(float(number)) if number else row_number + 1
+            column = 0
+            cells = []
+            for cell in row.iterchildren(CELL_TAG):
+                coordinate = cell.get("r")
+                column = _column_index(coordinate) if coordinate else column + 1
+                data_type = cell.get("t", "n")
+                if data_type == "inlineStr":
+                    child = cell.find(INLINE_STRING_TAG)
+                    value = _text_content(child) if child is not None else None
+                else:
+                    value = cell.findtext(VALUE_TAG) or None
+                    if value is not None:
+                        if data_type == "n":
+                            value = _cast_number(value)
+                            style = int(cell.get("s", 0))
+                            if style in date_styles:
+                                try:
+                                    value = from_excel(value, epoch, timedelta=style in timedelta_styles)
+                                except (OverflowError, ValueError):
+                                    value = "#VALUE!"
+                        elif data_type == "s":
+                            value = shared_strings[int(value)]
+                        elif data_type == "b":
+                            value = bool(int(value))
+                        elif data_type == "d":
+                            value = from_ISO8601(value)
+                cells.append((column, value))
+            # 已处理的行从树中移除，避免整张表的元素留在内存中
+            row.clear()
+            while row.getprevious() is not None:
+                del row.getparent()[0]
+            yield row_number, cells
+
+    def iter_rows(self, values_only=True):
+        """按行返回值元组，与 openpyxl 只读工作表 iter_rows(values_only=True) 一致"""
+        max_col = self.max_column
+        max_row = self.max_row
+        empty_row = (None,) * max_col if max_col is not None else ()
+        counter = 1
+        row_number = 0
+        with self.parent._archive.open(self._path) as src:
+            for row_number, cells in self._parse_rows(src):
+                if max_row is not None and row_number > max_row:
+                    break
+                while counter < row_number:
+                    counter += 1
+                    yield empty_row
+                if counter <= row_number:
+                    counter += 1
+                    width = max_col or (cells[-1][0] if cells else 0)
+                    values = [None] * width
+                    for column, value in cells:
+                        if 1 <= column <= width:
+                            values[column - 1] = value
+                    yield tuple(values)
+        if max_row is not None and max_row < row_number:
+            for _ in range(counter, max_row + 1):
+                yield empty_row